@@ -58,6 +58,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'gestion.context_processors.notificaciones',
             ],
         },
     },
@@ -128,6 +129,9 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Retención de notificaciones: las leídas con más días que esto se archivan (archivar_notificaciones)
+NOTIFICACIONES_DIAS_RETENCION = 90
+
 # Manejo de errores personalizado
 DEBUG_PROPAGATE_EXCEPTIONS = False
 
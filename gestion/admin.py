@@ -1,8 +1,8 @@
 from django.contrib import admin
 from .models import (
-    Cliente, Reserva, Cabaña, Pago,
+    Cliente, Reserva, Cabaña, Pago, ReglaTarifa,
     Implemento, PrestamoImplemento,
-    Notificacion, ChecklistInventario, EntregaCabaña, ItemVerificacion,
+    Notificacion, NotificacionArchivada, ContadorNotificaciones, AlertaEnviada, ChecklistInventario, EntregaCabaña, ItemVerificacion,
     TareaPreparacion, PreparacionCabaña, ItemPreparacionCompletado, ReporteFaltantes
 )
 
@@ -22,6 +22,12 @@ class ReservaAdmin(admin.ModelAdmin):
 class CabañaAdmin(admin.ModelAdmin):
     list_display = ('idCabaña', 'nombre', 'capacidad', 'estado', 'precioNoche')
 
+@admin.register(ReglaTarifa)
+class ReglaTarifaAdmin(admin.ModelAdmin):
+    list_display = ('idRegla', 'cabaña', 'tipo', 'nombre', 'fecha_inicio', 'fecha_fin', 'precio_noche', 'porcentaje', 'min_noches', 'prioridad', 'activa')
+    list_filter = ('tipo', 'activa', 'cabaña')
+    search_fields = ('nombre', 'cabaña__nombre')
+
 @admin.register(Pago)
 class PagoAdmin(admin.ModelAdmin):
     list_display = ('idPago', 'reserva', 'monto', 'metodo', 'fechaPago')
@@ -40,6 +46,21 @@ class NotificacionAdmin(admin.ModelAdmin):
     list_display = ('idNotificacion', 'usuario', 'tipo', 'fechaEnvio', 'leida')
     list_filter = ('tipo', 'leida')
 
+@admin.register(NotificacionArchivada)
+class NotificacionArchivadaAdmin(admin.ModelAdmin):
+    list_display = ('idNotificacion', 'usuario', 'tipo', 'fechaEnvio', 'fechaArchivo')
+    list_filter = ('tipo',)
+
+@admin.register(ContadorNotificaciones)
+class ContadorNotificacionesAdmin(admin.ModelAdmin):
+    list_display = ('usuario', 'total', 'no_leidas')
+    readonly_fields = ('usuario', 'total', 'no_leidas')
+
+@admin.register(AlertaEnviada)
+class AlertaEnviadaAdmin(admin.ModelAdmin):
+    list_display = ('idAlerta', 'reserva', 'tipo', 'fecha', 'fechaRegistro')
+    list_filter = ('tipo', 'fecha')
+
 @admin.register(ChecklistInventario)
 class ChecklistInventarioAdmin(admin.ModelAdmin):
     list_display = ('idChecklist', 'cabaña', 'nombre_item', 'categoria', 'cantidad_esperada', 'precio_reposicion', 'es_obligatorio', 'orden')
@@ -58,7 +79,7 @@ class EntregaCabañaAdmin(admin.ModelAdmin):
 class ItemVerificacionAdmin(admin.ModelAdmin):
     list_display = ('idItemVerificacion', 'entrega', 'item', 'cantidad_entregada', 'cantidad_devuelta', 'estado_entregado', 'estado_devuelto', 'cargo_aplicado')
     list_filter = ('estado_entregado', 'estado_devuelto', 'requiere_reposicion', 'entrega')
-    search_fields = ('item__nombre_item', 'entrega__reserva__cliente__nombre')
+    search_fields = ('nombre_item', 'entrega__reserva__cliente__nombre')
     readonly_fields = ('cargo_aplicado',)
 
 @admin.register(TareaPreparacion)
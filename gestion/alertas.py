@@ -0,0 +1,126 @@
+"""
+Alertas y recordatorios de reservas.
+
+Los recordatorios se envían 7, 4 y 3 días antes del inicio de cada reserva
+confirmada. Cada alerta enviada queda registrada en ``AlertaEnviada`` con la
+clave (reserva, tipo, fecha de inicio), de modo que volver a ejecutar el envío
+el mismo día no repite ninguna notificación.
+
+Un recordatorio que no se envió en su día (el comando no corrió, o la reserva
+se creó o confirmó después) se envía en la siguiente ejecución mientras siga
+vigente (``ATRASO_RECORDATORIOS``), con los días que realmente faltan.
+
+El registro se consulta en bloque dentro de la misma consulta que selecciona
+las reservas, así que ni el comando periódico ni ``Reserva.generarAlerta``
+escriben nada cuando no hay alertas nuevas.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Value, CharField, Exists, OuterRef
+from django.utils import timezone
+
+from .notificaciones import ajustar_contadores, deltas_de
+
+# tipo de alerta: (días antes del inicio, tipo de notificación, mensaje)
+RECORDATORIOS = {
+    'aviso_7_dias': (7, 'alerta', 'Su reserva en {cabaña} es {cuando}'),
+    'confirmacion_4_dias': (
+        4, 'recordatorio',
+        'URGENTE: Confirme su reserva en {cabaña} que inicia {cuando} ({fecha}). '
+        'Acceda a "Mis Reservas" para confirmar.'
+    ),
+    'aviso_3_dias': (3, 'alerta', 'Su reserva en {cabaña} es {cuando}'),
+}
+
+# tipo de alerta: días antes del inicio hasta los que (sin incluirlos) un
+# recordatorio atrasado todavía se envía. El aviso de 7 días deja de enviarse
+# cuando ya corresponde el de 3; los demás, hasta el día anterior al inicio.
+ATRASO_RECORDATORIOS = {
+    'aviso_7_dias': 3,
+    'confirmacion_4_dias': 0,
+    'aviso_3_dias': 0,
+}
+
+
+def _cuando(dias):
+    return 'mañana' if dias == 1 else f'en {dias} días'
+
+
+def reservas_a_recordar(hoy=None, reservas=None):
+    """
+    Recordatorios pendientes para el día: lista de
+    (id de reserva, tipo de alerta, fecha de inicio, nombre de la cabaña, id de usuario).
+
+    Una sola consulta (UNION ALL de una selección por tipo): las reservas
+    confirmadas cuyo inicio cae en la ventana vigente de cada tipo, descartando
+    las alertas ya registradas. ``reservas`` limita la búsqueda a esos ids.
+    """
+    from .models import Reserva, AlertaEnviada
+
+    hoy = hoy or timezone.now().date()
+
+    pendientes = Reserva.objects.filter(estado='confirmada', cliente__usuario__isnull=False)
+    if reservas is not None:
+        pendientes = pendientes.filter(pk__in=reservas)
+
+    por_tipo = []
+    for tipo, (dias, _, _) in RECORDATORIOS.items():
+        candidatas = pendientes.filter(
+            fechaInicio__gt=hoy + timedelta(days=ATRASO_RECORDATORIOS[tipo]),
+            fechaInicio__lte=hoy + timedelta(days=dias),
+        )
+        if tipo == 'confirmacion_4_dias':
+            candidatas = candidatas.filter(confirmacion_cliente=False)
+        por_tipo.append(candidatas.annotate(
+            tipo_alerta=Value(tipo, output_field=CharField()),
+        ).filter(
+            ~Exists(AlertaEnviada.objects.filter(
+                reserva=OuterRef('pk'),
+                tipo=tipo,
+                fecha=OuterRef('fechaInicio'),
+            ))
+        ).order_by().values_list(
+            'idReserva', 'tipo_alerta', 'fechaInicio', 'cabaña__nombre', 'cliente__usuario_id'
+        ))
+
+    return list(por_tipo[0].union(*por_tipo[1:], all=True))
+
+
+def enviar_recordatorios(hoy=None, reservas=None):
+    """
+    Envía los recordatorios pendientes del día (incluidos los atrasados que
+    sigan vigentes) y los registra como enviados.
+
+    El registro y las notificaciones se insertan con un ``bulk_create`` cada uno
+    dentro de la misma transacción: si otra ejecución simultánea ya registró
+    alguna de las alertas, la restricción única hace fallar la transacción completa
+    y no se envía nada duplicado. Devuelve la cantidad enviada por tipo de alerta.
+    """
+    from .models import AlertaEnviada, Notificacion
+
+    hoy = hoy or timezone.now().date()
+    pendientes = reservas_a_recordar(hoy, reservas)
+    ahora = timezone.now()
+    enviadas = {tipo: 0 for tipo in RECORDATORIOS}
+
+    registros = []
+    notificaciones = []
+    for reserva_id, tipo, fecha_inicio, cabaña, usuario_id in pendientes:
+        _, tipo_notificacion, mensaje = RECORDATORIOS[tipo]
+        registros.append(AlertaEnviada(reserva_id=reserva_id, tipo=tipo, fecha=fecha_inicio))
+        notificaciones.append(Notificacion(
+            usuario_id=usuario_id,
+            tipo=tipo_notificacion,
+            mensaje=mensaje.format(cabaña=cabaña, fecha=fecha_inicio, cuando=_cuando((fecha_inicio - hoy).days)),
+            fechaEnvio=ahora,
+        ))
+        enviadas[tipo] += 1
+
+    if registros:
+        with transaction.atomic():
+            AlertaEnviada.objects.bulk_create(registros)
+            Notificacion.objects.bulk_create(notificaciones)
+            ajustar_contadores(deltas_de(notificaciones))
+
+    return enviadas
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class GestionConfig(AppConfig):
+    """Configuración de la aplicación de gestión"""
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'gestion'
+
+    def ready(self):
+        # Registrar señales que mantienen los índices y tablas derivadas
+        from . import signals  # noqa: F401
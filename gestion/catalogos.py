@@ -0,0 +1,119 @@
+"""
+Catálogos de referencia en memoria del proceso.
+
+Las tareas de preparación (``TareaPreparacion``) y los checklists de inventario
+por cabaña (``ChecklistInventario``) solo cambian cuando un administrador los
+edita, pero se leen al iniciar cada preparación, al generar cada checklist y en
+cada vista de preparación. Se guardan aquí ya agrupados: las tareas por
+categoría y los checklists por cabaña.
+
+Las señales de ``gestion.signals`` invalidan la entrada afectada al guardar o
+eliminar. Como esas señales solo alcanzan al proceso que hace el cambio (y no
+se disparan con ``update()`` ni ``bulk_create``), cada entrada vence además a
+los ``VIGENCIA_CATALOGOS`` segundos. Los objetos entregados se comparten entre
+peticiones: se leen, no se modifican.
+"""
+from threading import Lock
+from time import monotonic
+
+# Segundos que una entrada se considera vigente aunque no se haya invalidado
+VIGENCIA_CATALOGOS = 300
+
+
+class CacheCatalogo:
+    """Valores por clave armados con ``cargar(clave)``, con invalidación versionada"""
+
+    def __init__(self, cargar=None, vigencia=VIGENCIA_CATALOGOS):
+        self._cargar = cargar
+        self._vigencia = vigencia
+        self._valores = {}
+        self._generaciones = {}
+        self._epoca = 0
+        self._lock = Lock()
+
+    def obtener(self, clave=None):
+        return self.obtener_varios([clave])[clave]
+
+    def obtener_varios(self, claves, cargar=None, vigente=None):
+        """
+        Valores de las claves indicadas: {clave: valor}. Las que falten o hayan
+        vencido se arman juntas con ``cargar(claves)`` (por defecto, una a una con
+        el ``cargar`` del cache); ``vigente(clave, valor)`` puede descartar además
+        una entrada que ya no corresponda.
+        """
+        ahora = monotonic()
+        valores = {}
+        faltantes = []
+        for clave in claves:
+            entrada = self._valores.get(clave)
+            if entrada is not None and entrada[1] > ahora and (vigente is None or vigente(clave, entrada[0])):
+                valores[clave] = entrada[0]
+            else:
+                faltantes.append(clave)
+        if not faltantes:
+            return valores
+
+        with self._lock:
+            versiones = {clave: (self._epoca, self._generaciones.get(clave, 0)) for clave in faltantes}
+        if cargar is None:
+            nuevos = {clave: self._cargar(clave) for clave in faltantes}
+        else:
+            nuevos = cargar(faltantes)
+        vence = monotonic() + self._vigencia
+        with self._lock:
+            for clave, valor in nuevos.items():
+                # Solo se guarda si nadie invalidó la clave mientras se cargaba
+                if (self._epoca, self._generaciones.get(clave, 0)) == versiones[clave]:
+                    self._valores[clave] = (valor, vence)
+        valores.update(nuevos)
+        return valores
+
+    def invalidar(self, *claves):
+        with self._lock:
+            for clave in claves:
+                self._valores.pop(clave, None)
+                self._generaciones[clave] = self._generaciones.get(clave, 0) + 1
+
+    def limpiar(self):
+        with self._lock:
+            self._epoca += 1
+            self._valores.clear()
+
+
+class CatalogoTareas:
+    """Tareas de preparación en orden, agrupadas por categoría y por id"""
+
+    def __init__(self, tareas):
+        self.tareas = tuple(tareas)
+        self.por_id = {tarea.pk: tarea for tarea in self.tareas}
+        self.por_categoria = {}
+        for tarea in self.tareas:
+            self.por_categoria.setdefault(tarea.categoria, []).append(tarea)
+
+
+def _cargar_tareas(_):
+    from .models import TareaPreparacion
+
+    return CatalogoTareas(TareaPreparacion.objects.order_by('categoria', 'orden', 'nombre'))
+
+
+def _cargar_checklist(cabaña_id):
+    from .models import ChecklistInventario
+
+    return tuple(
+        ChecklistInventario.objects.filter(cabaña_id=cabaña_id).order_by('orden', 'categoria', 'nombre_item')
+    )
+
+
+cache_tareas = CacheCatalogo(_cargar_tareas)
+cache_checklists = CacheCatalogo(_cargar_checklist)
+
+
+def catalogo_tareas():
+    """Catálogo de tareas de preparación (ver ``CatalogoTareas``)"""
+    return cache_tareas.obtener()
+
+
+def checklist_cabaña(cabaña_id):
+    """Items del checklist de inventario de la cabaña, ordenados por orden y categoría"""
+    return cache_checklists.obtener(cabaña_id)
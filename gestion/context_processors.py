@@ -0,0 +1,20 @@
+from django.utils.functional import SimpleLazyObject
+
+from .notificaciones import totales_notificaciones
+
+
+def notificaciones(request):
+    """
+    Contador de notificaciones del usuario para la insignia del menú.
+
+    Es perezoso: solo las páginas que muestran la insignia leen el contador
+    (una consulta por clave primaria).
+    """
+    if not request.user.is_authenticated:
+        return {}
+
+    def contador():
+        total, no_leidas = totales_notificaciones(request.user)
+        return {'total': total, 'no_leidas': no_leidas}
+
+    return {'contador_notificaciones': SimpleLazyObject(contador)}
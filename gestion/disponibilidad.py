@@ -0,0 +1,141 @@
+"""
+Disponibilidad de cabañas.
+
+Una cabaña está ocupada en un rango si tiene una reserva o un mantenimiento
+activo que se solape con él. Como de esta respuesta depende que no se acepten
+reservas dobles, al guardar siempre se consulta la base de datos:
+``cabaña_libre`` lo resuelve para una cabaña con a lo sumo dos consultas EXISTS.
+
+Para listar cabañas libres (búsqueda y alternativas) se usa en cambio un índice
+en memoria: por cabaña, los días ocupados de ``OcupacionDia`` y los tramos de
+sus mantenimientos, como intervalos ordenados y fusionados que se consultan con
+una búsqueda binaria. El índice es orientativo: se guarda en un
+``CacheCatalogo`` que las señales invalidan en este proceso y que vence a los
+``VIGENCIA_CATALOGOS`` segundos, así que puede no ver todavía un cambio hecho en
+otro proceso; la reserva elegida se vuelve a verificar contra la base de datos.
+"""
+from bisect import bisect_right
+
+from django.db.models import Q
+
+from .catalogos import CacheCatalogo
+
+ESTADOS_RESERVA_BLOQUEANTES = ['confirmada', 'pendiente']
+ESTADOS_MANTENIMIENTO_BLOQUEANTES = ['programado', 'en_proceso']
+
+# Un mantenimiento sin fecha de ejecución bloquea desde la fecha programada en adelante
+SIN_FIN = float('inf')
+
+
+def reservas_solapadas(cabaña, fecha_inicio, fecha_fin):
+    """Reservas activas de la cabaña (id u ``OuterRef``) que se solapan con [fecha_inicio, fecha_fin]"""
+    from .models import Reserva
+
+    return Reserva.objects.filter(
+        cabaña=cabaña,
+        estado__in=ESTADOS_RESERVA_BLOQUEANTES,
+        fechaInicio__lte=fecha_fin,
+        fechaFin__gte=fecha_inicio,
+    )
+
+
+def mantenimientos_solapados(cabaña, fecha_inicio, fecha_fin):
+    """
+    Mantenimientos activos de la cabaña (id u ``OuterRef``) que se solapan con
+    [fecha_inicio, fecha_fin]. Sin fecha de ejecución, un mantenimiento bloquea
+    desde la fecha programada en adelante.
+    """
+    from .models import Mantenimiento
+
+    return Mantenimiento.objects.filter(
+        Q(fechaEjecucion__isnull=True) | Q(fechaEjecucion__gte=fecha_inicio),
+        cabaña=cabaña,
+        estado__in=ESTADOS_MANTENIMIENTO_BLOQUEANTES,
+        fechaProgramada__lte=fecha_fin,
+    )
+
+
+def cabaña_libre(cabaña_id, fecha_inicio, fecha_fin):
+    """Indica si la cabaña no tiene bloqueos en el rango cerrado [fecha_inicio, fecha_fin]"""
+    return not (
+        mantenimientos_solapados(cabaña_id, fecha_inicio, fecha_fin).exists()
+        or reservas_solapadas(cabaña_id, fecha_inicio, fecha_fin).exists()
+    )
+
+
+def fusionar_intervalos(intervalos):
+    """Ordena y fusiona intervalos cerrados (en ordinales) que se solapan o son contiguos"""
+    inicios = []
+    fines = []
+    for inicio, fin in sorted(intervalos):
+        if fines and inicio <= fines[-1] + 1:
+            if fin > fines[-1]:
+                fines[-1] = fin
+        else:
+            inicios.append(inicio)
+            fines.append(fin)
+    return inicios, fines
+
+
+class IntervalosOcupados:
+    """Intervalos ocupados de una cabaña, ordenados y sin solapamiento"""
+
+    def __init__(self, intervalos):
+        self.inicios, self.fines = fusionar_intervalos(intervalos)
+
+    def libre(self, fecha_inicio, fecha_fin):
+        """Indica si ningún intervalo toca el rango cerrado [fecha_inicio, fecha_fin]"""
+        posicion = bisect_right(self.inicios, fecha_fin.toordinal()) - 1
+        return posicion < 0 or self.fines[posicion] < fecha_inicio.toordinal()
+
+
+def _cargar_intervalos(cabaña_ids):
+    """Intervalos ocupados de las cabañas indicadas, con una consulta por tabla"""
+    from .models import Mantenimiento, OcupacionDia
+
+    intervalos = {cabaña_id: [] for cabaña_id in cabaña_ids}
+    for cabaña_id, fecha in OcupacionDia.objects.filter(
+        cabaña_id__in=cabaña_ids,
+    ).order_by().values_list('cabaña_id', 'fecha'):
+        dia = fecha.toordinal()
+        intervalos[cabaña_id].append((dia, dia))
+
+    # OcupacionDia marca solo el día programado; el mantenimiento bloquea hasta su ejecución
+    for cabaña_id, programada, ejecucion in Mantenimiento.objects.filter(
+        cabaña_id__in=cabaña_ids,
+        estado__in=ESTADOS_MANTENIMIENTO_BLOQUEANTES,
+    ).order_by().values_list('cabaña_id', 'fechaProgramada', 'fechaEjecucion'):
+        inicio = programada.toordinal()
+        fin = max(inicio, ejecucion.toordinal()) if ejecucion else SIN_FIN
+        intervalos[cabaña_id].append((inicio, fin))
+
+    return {cabaña_id: IntervalosOcupados(tramos) for cabaña_id, tramos in intervalos.items()}
+
+
+indice_ocupacion = CacheCatalogo()
+
+
+def intervalos_ocupados(cabaña_ids):
+    """Índice de ocupación de las cabañas: {id de cabaña: ``IntervalosOcupados``}"""
+    return indice_ocupacion.obtener_varios(cabaña_ids, cargar=_cargar_intervalos)
+
+
+def buscar_cabañas_disponibles(fecha_inicio, fecha_fin, num_personas=1):
+    """
+    Cabañas libres en [fecha_inicio, fecha_fin] con capacidad suficiente, de la
+    más económica a la más cara.
+
+    Aplica las mismas reglas que ``Reserva.verificar_disponibilidad_cabaña`` pero
+    sobre el índice en memoria, así que el resultado es orientativo: reservar una
+    de estas cabañas vuelve a verificarse contra la base de datos.
+    """
+    from .models import Cabaña
+
+    candidatas = list(Cabaña.objects.filter(
+        capacidad__gte=num_personas,
+    ).exclude(
+        estado='mantenimiento',
+    ).order_by('precioNoche', 'nombre'))
+    indice = intervalos_ocupados([cabaña.pk for cabaña in candidatas])
+    return [cabaña for cabaña in candidatas if indice[cabaña.pk].libre(fecha_inicio, fecha_fin)]
+
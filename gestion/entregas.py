@@ -0,0 +1,279 @@
+"""
+Entregas de cabañas: checklist de inventario y cargos de cada entrega.
+
+El checklist de una entrega es una fila ``ItemVerificacion`` por cada item del
+``ChecklistInventario`` de la cabaña. Los items que faltan se calculan con un
+anti-join (NOT EXISTS) y se insertan con un solo ``bulk_create``; la restricción
+única (entrega, item) hace inofensivas las instanciaciones simultáneas. Una vez
+completo el checklist, instanciarlo de nuevo es una sola consulta sin escrituras.
+
+Los cargos por faltantes y daños de la devolución se calculan para todas las
+verificaciones de una o varias entregas con un solo UPDATE. El cálculo se hace
+en centavos enteros (redondeo al centavo, mitades hacia arriba) y recién al
+final se divide por 100, así que se guarda el mismo valor que guardaría Django
+al asignar ese monto como ``Decimal``.
+
+El check-in y el check-out del encargado leen el formulario en memoria, guardan
+solo las verificaciones que cambiaron con un ``bulk_update`` y actualizan la
+entrega (y en el check-out sus cargos) en la misma transacción: la cantidad de
+sentencias no depende de la cantidad de items del checklist.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import (
+    Case, When, Value, F, Q, Count, Sum, Exists, OuterRef, ExpressionWrapper,
+    IntegerField, DecimalField, BooleanField,
+)
+from django.db.models.functions import Cast, Round
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from .paginacion import paginar_por_clave
+
+CENTAVO = Decimal('0.01')
+CERO = Decimal('0.00')
+
+TAMAÑO_PAGINA_ENTREGAS = 25
+
+# Porcentaje del precio de reposición cobrado por unidad devuelta en cada estado
+PORCENTAJES_CARGO = {
+    'danado': 50,
+    'regular': 20,
+}
+
+
+def instanciar_checklist(entrega, cabaña_id, estado_inicial='bueno'):
+    """
+    Crea las verificaciones que falten en la entrega para los items del
+    checklist de la cabaña, con la cantidad esperada como cantidad entregada y
+    una copia de los datos del item (``ItemVerificacion.CAMPOS_CHECKLIST``).
+    Devuelve la cantidad de filas creadas (intentadas).
+    """
+    from .models import ChecklistInventario, ItemVerificacion
+
+    faltantes = ChecklistInventario.objects.filter(cabaña_id=cabaña_id).filter(
+        ~Exists(ItemVerificacion.objects.filter(entrega=entrega, item=OuterRef('pk')))
+    ).order_by().values('pk', *ItemVerificacion.CAMPOS_CHECKLIST)
+
+    nuevas = [
+        ItemVerificacion(
+            entrega=entrega,
+            item_id=item.pop('pk'),
+            cantidad_entregada=item['cantidad_esperada'],
+            estado_entregado=estado_inicial,
+            **item,
+        )
+        for item in faltantes
+    ]
+    if nuevas:
+        ItemVerificacion.objects.bulk_create(nuevas, batch_size=500, ignore_conflicts=True)
+    return len(nuevas)
+
+
+def cargo_item(cantidad_entregada, cantidad_devuelta, estado_devuelto, precio_reposicion):
+    """
+    Cargo de una verificación: las unidades faltantes al precio de reposición más
+    el porcentaje de ``PORCENTAJES_CARGO`` por cada unidad devuelta en ese estado.
+    """
+    precio = Decimal(precio_reposicion)
+    cargo = Decimal('0')
+    if cantidad_devuelta < cantidad_entregada:
+        cargo += (cantidad_entregada - cantidad_devuelta) * precio
+    porcentaje = PORCENTAJES_CARGO.get(estado_devuelto)
+    if porcentaje and cantidad_devuelta > 0:
+        cargo += cantidad_devuelta * precio * porcentaje / 100
+    return cargo.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def _cargo_en_centavos():
+    """Expresión SQL de ``cargo_item`` en centavos enteros, con el precio copiado en la verificación"""
+    precio = Cast(Round(F('precio_reposicion') * 100), IntegerField())
+    faltantes = Case(
+        When(cantidad_devuelta__lt=F('cantidad_entregada'),
+             then=F('cantidad_entregada') - F('cantidad_devuelta')),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    porcentaje = Case(
+        *[When(estado_devuelto=estado, cantidad_devuelta__gt=0, then=Value(valor))
+          for estado, valor in PORCENTAJES_CARGO.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    # Centésimos de centavo, luego redondeo al centavo sumando media unidad
+    centesimos = faltantes * precio * 100 + F('cantidad_devuelta') * precio * porcentaje
+    return (centesimos + 50) / 100
+
+
+def aplicar_cargos(entregas):
+    """
+    Calcula y guarda cargo_aplicado y requiere_reposicion de todas las
+    verificaciones de las entregas indicadas (instancias o ids) con un solo
+    UPDATE. Devuelve {id de entrega: total de cargos} con un solo agregado.
+    """
+    from .models import ItemVerificacion
+
+    entrega_ids = [getattr(entrega, 'pk', entrega) for entrega in entregas]
+    verificaciones = ItemVerificacion.objects.filter(entrega_id__in=entrega_ids)
+
+    centavos = _cargo_en_centavos()
+    verificaciones.update(
+        cargo_aplicado=ExpressionWrapper(centavos / Value(100.0), output_field=DecimalField()),
+        requiere_reposicion=Case(
+            When(GreaterThan(centavos, 0), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+    )
+
+    totales = {entrega_id: CERO for entrega_id in entrega_ids}
+    for entrega_id, total in verificaciones.order_by().values('entrega_id').annotate(
+        total=Sum('cargo_aplicado'),
+    ).values_list('entrega_id', 'total'):
+        totales[entrega_id] = (total or CERO).quantize(CENTAVO)
+    return totales
+
+
+def _leer_item(item_ver, datos, cantidad_por_defecto):
+    """(cantidad, estado, observación) del formulario para una verificación"""
+    from .models import ItemVerificacion
+
+    pk = item_ver.pk
+    try:
+        cantidad = int(datos.get(f'cantidad_{pk}', cantidad_por_defecto))
+    except (ValueError, TypeError):
+        cantidad = cantidad_por_defecto
+    estado = datos.get(f'estado_{pk}', 'bueno')
+    if estado not in dict(ItemVerificacion.ESTADOS):
+        estado = 'bueno'
+    return cantidad, estado, datos.get(f'obs_{pk}', '')
+
+
+def cambios_entrega(items_verificacion, datos):
+    """
+    Aplica en memoria las cantidades, estados y observaciones del check-in y
+    devuelve solo las verificaciones que cambiaron.
+    """
+    cambiados = []
+    for item_ver in items_verificacion:
+        cantidad, estado, observacion = _leer_item(item_ver, datos, item_ver.cantidad_esperada)
+        observaciones = observacion or item_ver.observaciones
+
+        if (cantidad, estado, observaciones) == (
+                item_ver.cantidad_entregada, item_ver.estado_entregado, item_ver.observaciones):
+            continue
+        item_ver.cantidad_entregada = cantidad
+        item_ver.estado_entregado = estado
+        item_ver.observaciones = observaciones
+        cambiados.append(item_ver)
+    return cambiados
+
+
+def cambios_devolucion(items_verificacion, datos):
+    """
+    Aplica en memoria las cantidades y estados del check-out, agregando la
+    observación de cada item como ``[Check-out] ...``, y devuelve solo las
+    verificaciones que cambiaron.
+    """
+    cambiados = []
+    for item_ver in items_verificacion:
+        cantidad, estado, observacion = _leer_item(item_ver, datos, 0)
+        observaciones = item_ver.observaciones
+        if observacion:
+            observaciones += f"\n[Check-out] {observacion}"
+
+        if (cantidad, estado, observaciones) == (
+                item_ver.cantidad_devuelta, item_ver.estado_devuelto, item_ver.observaciones):
+            continue
+        item_ver.cantidad_devuelta = cantidad
+        item_ver.estado_devuelto = estado
+        item_ver.observaciones = observaciones
+        cambiados.append(item_ver)
+    return cambiados
+
+
+def registrar_check_in(entrega, items_verificacion, datos, encargado, ahora=None):
+    """
+    Check-in: guarda las verificaciones que cambiaron y marca la entrega como
+    entregada, en una transacción. Devuelve la cantidad de verificaciones
+    actualizadas.
+    """
+    from .models import ItemVerificacion
+
+    cambiados = cambios_entrega(items_verificacion, datos)
+    entrega.fecha_entrega = ahora or timezone.now()
+    entrega.encargado_entrega = encargado
+    entrega.estado = 'entregada'
+    entrega.observaciones_entrega = datos.get('observaciones_entrega', '')
+
+    with transaction.atomic():
+        if cambiados:
+            ItemVerificacion.objects.bulk_update(
+                cambiados, ['cantidad_entregada', 'estado_entregado', 'observaciones'])
+        entrega.save(update_fields=[
+            'fecha_entrega', 'encargado_entrega', 'estado', 'observaciones_entrega'])
+    return len(cambiados)
+
+
+def registrar_check_out(entrega, items_verificacion, datos, ahora=None):
+    """
+    Check-out: guarda las verificaciones que cambiaron, marca la entrega como
+    verificada y aplica los cargos de toda la entrega (``aplicar_cargos``), en
+    una transacción. Devuelve el total de cargos de la entrega.
+    """
+    from .models import ItemVerificacion
+
+    cambiados = cambios_devolucion(items_verificacion, datos)
+    entrega.fecha_devolucion = ahora or timezone.now()
+    entrega.estado = 'verificada'
+    entrega.observaciones_devolucion = datos.get('observaciones_devolucion', '')
+
+    with transaction.atomic():
+        if cambiados:
+            ItemVerificacion.objects.bulk_update(
+                cambiados, ['cantidad_devuelta', 'estado_devuelto', 'observaciones'])
+        entrega.save(update_fields=['fecha_devolucion', 'estado', 'observaciones_devolucion'])
+        return aplicar_cargos([entrega])[entrega.pk]
+
+
+def adjuntar_cargos(entregas):
+    """Asigna a cada entrega de la lista su ``total_cargos`` (suma de sus verificaciones) con un solo agregado"""
+    from .models import ItemVerificacion
+
+    totales = dict(ItemVerificacion.objects.filter(
+        entrega_id__in=[entrega.pk for entrega in entregas],
+    ).order_by().values('entrega_id').annotate(
+        total=Sum('cargo_aplicado'),
+    ).values_list('entrega_id', 'total'))
+    for entrega in entregas:
+        entrega.total_cargos = (totales.get(entrega.pk) or CERO).quantize(CENTAVO)
+    return entregas
+
+
+def resumen_entregas():
+    """Total de entregas, verificadas y cargos de las verificadas en un solo agregado"""
+    from .models import EntregaCabaña
+
+    resumen = EntregaCabaña.objects.order_by().aggregate(
+        total_entregas=Count('idEntrega', distinct=True),
+        entregas_completadas=Count('idEntrega', filter=Q(estado='verificada'), distinct=True),
+        total_cargos=Sum('items_verificacion__cargo_aplicado', filter=Q(estado='verificada')),
+    )
+    resumen['total_cargos'] = (resumen['total_cargos'] or CERO).quantize(CENTAVO)
+    return resumen
+
+
+def paginar_entregas(entregas, despues=None, antes=None, tamaño=TAMAÑO_PAGINA_ENTREGAS):
+    """
+    Página de entregas de la más reciente a la más antigua por clave
+    (fecha_entrega, idEntrega) con ``paginar_por_clave``; las que aún no tienen
+    fecha de entrega van al final. Solo las entregas de la página se leen, con
+    reserva, cliente, cabaña y encargado, y se les agrega ``total_cargos``.
+    Devuelve ``{'entregas': [...], 'anterior': cursor o None, 'siguiente': cursor o None}``.
+    """
+    filas, anterior, siguiente = paginar_por_clave(
+        entregas.select_related('reserva__cliente', 'reserva__cabaña', 'encargado_entrega'),
+        'fecha_entrega', despues, antes, tamaño,
+    )
+    return {'entregas': adjuntar_cargos(filas), 'anterior': anterior, 'siguiente': siguiente}
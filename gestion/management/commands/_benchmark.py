@@ -0,0 +1,102 @@
+"""
+Utilidades compartidas por los comandos ``benchmark_*``.
+
+Los datos sintéticos se crean dentro de una transacción que siempre se revierte,
+así que los benchmarks pueden ejecutarse sobre la base de datos real sin dejar rastro.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from gestion.models import Cliente, Cabaña, Reserva, Mantenimiento
+
+
+@contextmanager
+def transaccion_descartable():
+    """Ejecuta el bloque dentro de una transacción que se revierte al salir"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def cronometrar(funcion, repeticiones=1):
+    """Devuelve (resultado de la última ejecución, segundos promedio por ejecución)"""
+    resultado = None
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) / repeticiones
+
+
+def medir(funcion):
+    """Ejecuta la función una vez y devuelve (resultado, segundos, consultas SQL ejecutadas)"""
+    reset_queries()
+    with CaptureQueriesContext(connection) as consultas:
+        resultado, segundos = cronometrar(funcion)
+    return resultado, segundos, len(consultas)
+
+
+def crear_cabañas(cantidad, prefijo='Bench'):
+    """Crea cabañas sintéticas con capacidades y precios variados"""
+    return Cabaña.objects.bulk_create([
+        Cabaña(
+            nombre=f'{prefijo} {i:04d}',
+            capacidad=2 + i % 7,
+            estado='disponible',
+            precioNoche=Decimal(30000 + (i % 10) * 5000),
+        )
+        for i in range(cantidad)
+    ])
+
+
+def crear_cliente(nombre='Cliente Benchmark'):
+    return Cliente.objects.create(
+        nombre=nombre,
+        telefono='000000000',
+        email='benchmark@cabanitas.com',
+        direccion='Sin dirección',
+    )
+
+
+def crear_reservas(cabañas, cliente, cantidad, desde=None, horizonte=365, semilla=1):
+    """Crea reservas aleatorias de 1 a 7 noches repartidas en el horizonte indicado"""
+    aleatorio = random.Random(semilla)
+    desde = desde or timezone.now().date()
+    reservas = []
+    for _ in range(cantidad):
+        inicio = desde + timedelta(days=aleatorio.randrange(horizonte))
+        reservas.append(Reserva(
+            cliente=cliente,
+            cabaña=aleatorio.choice(cabañas),
+            fechaInicio=inicio,
+            fechaFin=inicio + timedelta(days=aleatorio.randint(1, 7)),
+            numPersonas=2,
+            estado=aleatorio.choice(['pendiente', 'confirmada', 'confirmada', 'cancelada']),
+            montoCotizado=Decimal('0'),
+        ))
+    return Reserva.objects.bulk_create(reservas, batch_size=500)
+
+
+def crear_mantenimientos(cabañas, cantidad, desde=None, horizonte=365, semilla=2):
+    """Crea mantenimientos aleatorios, algunos sin fecha de ejecución"""
+    aleatorio = random.Random(semilla)
+    desde = desde or timezone.now().date()
+    mantenimientos = []
+    for _ in range(cantidad):
+        programada = desde + timedelta(days=aleatorio.randrange(horizonte))
+        ejecucion = programada + timedelta(days=aleatorio.randint(0, 3)) if aleatorio.random() < 0.8 else None
+        mantenimientos.append(Mantenimiento(
+            cabaña=aleatorio.choice(cabañas),
+            tipo='preventivo',
+            descripcion='Mantenimiento de benchmark',
+            fechaProgramada=programada,
+            fechaEjecucion=ejecucion,
+            estado=aleatorio.choice(['programado', 'en_proceso', 'completado']),
+        ))
+    return Mantenimiento.objects.bulk_create(mantenimientos, batch_size=500)
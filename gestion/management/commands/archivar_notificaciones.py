@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion.notificaciones import archivar_lote
+
+
+class Command(BaseCommand):
+    help = ('Mueve a la tabla de archivo las notificaciones leídas con más días que la retención '
+            'configurada (NOTIFICACIONES_DIAS_RETENCION), en lotes acotados')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.NOTIFICACIONES_DIAS_RETENCION,
+                            help='Archivar las leídas con más de estos días (por defecto, NOTIFICACIONES_DIAS_RETENCION)')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Notificaciones por transacción')
+        parser.add_argument('--pausa', type=float, default=0,
+                            help='Segundos de espera entre lotes, para dejar pasar otras escrituras')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1 or options['lote'] < 1:
+            raise CommandError('--dias y --lote deben ser mayores que cero.')
+
+        antes_de = timezone.now() - timedelta(days=options['dias'])
+        total = 0
+        lotes = 0
+        inicio = time.perf_counter()
+        while True:
+            archivadas = archivar_lote(antes_de, options['lote'])
+            if not archivadas:
+                break
+            total += archivadas
+            lotes += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Lote {lotes}: {archivadas} notificaciones')
+            if archivadas < options['lote']:
+                break
+            if options['pausa']:
+                time.sleep(options['pausa'])
+        segundos = time.perf_counter() - inicio
+
+        velocidad = total / segundos if segundos else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} notificaciones archivadas en {lotes} lotes, {segundos:.2f} s ({velocidad:.0f} filas/s)'
+        ))
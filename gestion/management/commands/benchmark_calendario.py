@@ -0,0 +1,105 @@
+from calendar import monthrange
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from gestion.models import Cabaña, Reserva, Mantenimiento
+from gestion.ocupacion import construir_matriz_ocupacion, reconstruir_ocupacion
+from ._benchmark import (
+    transaccion_descartable, medir, crear_cabañas, crear_cliente,
+    crear_reservas, crear_mantenimientos,
+)
+
+
+def construir_calendario_anterior(cabañas, año, mes):
+    """Implementación anterior de calendario_disponibilidad: cabañas × días × reservas"""
+    dias_mes = monthrange(año, mes)[1]
+    fecha_inicio_mes = date(año, mes, 1)
+    fecha_fin_mes = date(año, mes, dias_mes)
+
+    reservas = Reserva.objects.filter(
+        fechaInicio__lte=fecha_fin_mes,
+        fechaFin__gte=fecha_inicio_mes,
+        estado__in=['confirmada', 'pendiente']
+    ).select_related('cabaña', 'cliente')
+
+    mantenimientos = Mantenimiento.objects.filter(
+        fechaProgramada__lte=fecha_fin_mes,
+        fechaProgramada__gte=fecha_inicio_mes,
+        estado__in=['programado', 'en_proceso']
+    ).select_related('cabaña')
+
+    calendario_data = []
+    for cabaña in cabañas:
+        fila = {'cabaña': cabaña, 'dias': []}
+        for dia in range(1, dias_mes + 1):
+            fecha_dia = date(año, mes, dia)
+            dia_info = {'estado': 'disponible', 'reserva': None}
+            for reserva in reservas:
+                if reserva.cabaña == cabaña and reserva.fechaInicio <= fecha_dia <= reserva.fechaFin:
+                    dia_info['estado'] = 'reservada'
+                    dia_info['reserva'] = reserva
+                    break
+            if dia_info['estado'] == 'disponible':
+                for mantenimiento in mantenimientos:
+                    if mantenimiento.cabaña == cabaña and mantenimiento.fechaProgramada == fecha_dia:
+                        dia_info['estado'] = 'mantenimiento'
+                        break
+            fila['dias'].append(dia_info)
+        calendario_data.append(fila)
+    return calendario_data
+
+
+class Command(BaseCommand):
+    help = 'Mide el armado y render del calendario de disponibilidad con 10, 100 y 500 cabañas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cabañas', type=int, nargs='+', default=[10, 100, 500])
+        parser.add_argument('--reservas-por-cabaña', type=int, default=6,
+                            help='Reservas por cabaña en el mes medido')
+        parser.add_argument('--max-anterior', type=int, default=100,
+                            help='No medir la implementación anterior por sobre esta cantidad de cabañas')
+
+    def handle(self, *args, **options):
+        hoy = timezone.now().date()
+        año, mes = hoy.year, hoy.month
+        dias_mes = monthrange(año, mes)[1]
+        inicio_mes = date(año, mes, 1)
+        fin_mes = date(año, mes, dias_mes)
+
+        self.stdout.write(f'{"Cabañas":>8} {"Reservas":>9} {"Anterior":>12} {"Matriz":>10} {"Render":>10} {"SQL":>5}')
+        for num_cabañas in options['cabañas']:
+            with transaccion_descartable():
+                cabañas = crear_cabañas(num_cabañas)
+                cliente = crear_cliente()
+                num_reservas = num_cabañas * options['reservas_por_cabaña']
+                crear_reservas(cabañas, cliente, num_reservas, desde=inicio_mes, horizonte=dias_mes)
+                crear_mantenimientos(cabañas, num_cabañas // 2, desde=inicio_mes, horizonte=dias_mes)
+                cabañas = list(Cabaña.objects.filter(nombre__startswith='Bench').order_by('nombre'))
+                # bulk_create no emite señales: se materializa la ocupación de los datos sintéticos
+                reconstruir_ocupacion([cabaña.pk for cabaña in cabañas])
+
+                matriz, t_matriz, consultas = medir(
+                    lambda: construir_matriz_ocupacion(cabañas, inicio_mes, fin_mes))
+                _, t_render, _ = medir(lambda: render_to_string('admin/calendario_disponibilidad.html', {
+                    'calendario_data': construir_matriz_ocupacion(cabañas, inicio_mes, fin_mes),
+                    'dia_hoy': hoy.day,
+                    'mes': mes,
+                    'año': año,
+                    'dias_mes': dias_mes,
+                }))
+
+                anterior = '-'
+                if num_cabañas <= options['max_anterior']:
+                    calendario, t_anterior, _ = medir(lambda: construir_calendario_anterior(cabañas, año, mes))
+                    esperado = [[dia['estado'] for dia in fila['dias']] for fila in calendario]
+                    obtenido = [[estado for estado, _ in fila['dias']] for fila in matriz]
+                    if esperado != obtenido:
+                        self.stdout.write(self.style.ERROR('La matriz no coincide con la implementación anterior'))
+                        return
+                    anterior = f'{t_anterior * 1000:.1f} ms'
+
+            self.stdout.write(f'{num_cabañas:>8} {num_reservas:>9} {anterior:>12} '
+                              f'{t_matriz * 1000:>7.1f} ms {t_render * 1000:>7.1f} ms {consultas:>5}')
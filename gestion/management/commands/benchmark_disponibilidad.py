@@ -0,0 +1,130 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from gestion.disponibilidad import (
+    buscar_cabañas_disponibles, indice_ocupacion, intervalos_ocupados,
+    mantenimientos_solapados, reservas_solapadas,
+)
+from gestion.models import Cabaña, Reserva, Mantenimiento
+from gestion.ocupacion import reconstruir_ocupacion
+from ._benchmark import (
+    transaccion_descartable, medir, crear_cabañas, crear_cliente,
+    crear_reservas, crear_mantenimientos,
+)
+
+
+def verificar_con_consultas(cabaña, fecha_inicio, fecha_fin):
+    """Implementación anterior de Reserva.verificar_disponibilidad_cabaña (dos consultas por llamada)"""
+    mantenimientos = Mantenimiento.objects.filter(
+        cabaña=cabaña,
+        fechaProgramada__lte=fecha_fin,
+        estado__in=['programado', 'en_proceso']
+    )
+
+    for mantenimiento in mantenimientos:
+        if not mantenimiento.fechaEjecucion:
+            if mantenimiento.fechaProgramada <= fecha_fin:
+                return False
+        elif mantenimiento.fechaEjecucion >= fecha_inicio:
+            return False
+
+    if cabaña.estado == 'mantenimiento':
+        return False
+
+    reservas_existentes = Reserva.objects.filter(
+        cabaña=cabaña,
+        estado__in=['confirmada', 'pendiente'],
+    ).filter(
+        Q(fechaInicio__lte=fecha_fin) & Q(fechaFin__gte=fecha_inicio)
+    )
+
+    return not reservas_existentes.exists()
+
+
+def buscar_en_base(fecha_inicio, fecha_fin, num_personas):
+    """Búsqueda exacta con subconsultas NOT EXISTS, sin pasar por el índice en memoria"""
+    return list(Cabaña.objects.filter(
+        capacidad__gte=num_personas,
+    ).exclude(
+        estado='mantenimiento',
+    ).exclude(
+        Exists(reservas_solapadas(OuterRef('pk'), fecha_inicio, fecha_fin)),
+    ).exclude(
+        Exists(mantenimientos_solapados(OuterRef('pk'), fecha_inicio, fecha_fin)),
+    ).order_by('precioNoche', 'nombre'))
+
+
+class Command(BaseCommand):
+    help = ('Compara el índice de ocupación en memoria con las consultas a la base de datos, '
+            'por cabaña y en la búsqueda de cabañas libres')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cabañas', type=int, default=40)
+        parser.add_argument('--reservas', type=int, default=5000)
+        parser.add_argument('--mantenimientos', type=int, default=200)
+        parser.add_argument('--consultas', type=int, default=2000)
+        parser.add_argument('--busquedas', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaccion_descartable():
+            hoy = timezone.now().date()
+            cabañas = crear_cabañas(options['cabañas'])
+            cliente = crear_cliente()
+            crear_reservas(cabañas, cliente, options['reservas'])
+            crear_mantenimientos(cabañas, options['mantenimientos'])
+            # bulk_create no dispara las señales: se materializa la ocupación a mano
+            reconstruir_ocupacion([cabaña.pk for cabaña in cabañas])
+            indice_ocupacion.limpiar()
+
+            aleatorio = random.Random(3)
+            consultas = []
+            for _ in range(options['consultas']):
+                inicio = hoy + timedelta(days=aleatorio.randrange(400))
+                consultas.append((aleatorio.choice(cabañas), inicio, inicio + timedelta(days=aleatorio.randint(1, 10))))
+            busquedas = [(inicio, fin, aleatorio.randint(1, 8)) for _, inicio, fin in consultas[:options['busquedas']]]
+
+            def por_consultas():
+                return [verificar_con_consultas(*consulta) for consulta in consultas]
+
+            def por_indice():
+                indice = intervalos_ocupados([cabaña.pk for cabaña in cabañas])
+                return [
+                    cabaña.estado != 'mantenimiento' and indice[cabaña.pk].libre(inicio, fin)
+                    for cabaña, inicio, fin in consultas
+                ]
+
+            def busqueda_en_base():
+                return [[c.pk for c in buscar_en_base(*busqueda)] for busqueda in busquedas]
+
+            def busqueda_por_indice():
+                return [[c.pk for c in buscar_cabañas_disponibles(*busqueda)] for busqueda in busquedas]
+
+            esperado, t_consultas, q_consultas = medir(por_consultas)
+            obtenido, t_indice, q_indice = medir(por_indice)
+            esperado_busqueda, t_base, q_base = medir(busqueda_en_base)
+            obtenido_busqueda, t_busqueda, q_busqueda = medir(busqueda_por_indice)
+        indice_ocupacion.limpiar()
+
+        if esperado != obtenido or esperado_busqueda != obtenido_busqueda:
+            self.stdout.write(self.style.ERROR('El índice y la base de datos no coinciden'))
+            return
+
+        n = len(consultas)
+        b = len(busquedas)
+        self.stdout.write(f'{n} consultas y {b} búsquedas sobre {len(cabañas)} cabañas, '
+                          f'{options["reservas"]} reservas, {options["mantenimientos"]} mantenimientos')
+        self.stdout.write(f'  Por cabaña, implementación anterior: {t_consultas / n * 1e6:9.1f} µs/llamada '
+                          f'({q_consultas} consultas SQL)')
+        self.stdout.write(f'  Por cabaña, índice en memoria:       {t_indice / n * 1e6:9.1f} µs/llamada '
+                          f'({q_indice} consultas SQL, incluida la carga)')
+        self.stdout.write(f'  Búsqueda, NOT EXISTS:                {t_base / b * 1e6:9.1f} µs/llamada '
+                          f'({q_base} consultas SQL)')
+        self.stdout.write(f'  Búsqueda, índice en memoria:         {t_busqueda / b * 1e6:9.1f} µs/llamada '
+                          f'({q_busqueda} consultas SQL)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Aceleración: x{t_consultas / max(t_indice, 1e-9):.1f} por cabaña, '
+            f'x{t_base / max(t_busqueda, 1e-9):.1f} en la búsqueda'))
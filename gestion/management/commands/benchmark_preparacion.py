@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+
+from gestion.models import TareaPreparacion, PreparacionCabaña, ItemPreparacionCompletado
+from gestion.catalogos import cache_tareas
+from gestion.preparacion import iniciar_preparacion
+from ._benchmark import transaccion_descartable, medir, crear_cabañas, crear_cliente, crear_reservas
+
+
+def iniciar_preparacion_anterior(reserva):
+    """Implementación anterior: un INSERT por tarea del catálogo"""
+    preparacion, created = PreparacionCabaña.objects.get_or_create(
+        reserva=reserva,
+        defaults={'estado': 'pendiente'}
+    )
+    if created:
+        tareas = TareaPreparacion.objects.all().order_by('categoria', 'orden')
+        for tarea in tareas:
+            ItemPreparacionCompletado.objects.create(
+                preparacion=preparacion,
+                tarea=tarea,
+                completado=False
+            )
+    return preparacion
+
+
+def crear_tareas(cantidad):
+    categorias = [codigo for codigo, _ in TareaPreparacion.CATEGORIAS]
+    return TareaPreparacion.objects.bulk_create([
+        TareaPreparacion(
+            categoria=categorias[i % len(categorias)],
+            nombre=f'Tarea benchmark {i:05d}',
+            orden=i,
+        )
+        for i in range(cantidad)
+    ], batch_size=500)
+
+
+class Command(BaseCommand):
+    help = 'Mide el inicio de una preparación (instanciación de tareas) con catálogos de 50, 500 y 5000 tareas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tareas', type=int, nargs='+', default=[50, 500, 5000])
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"Tareas":>7} {"Anterior":>12} {"SQL":>6} {"Servicio":>12} {"SQL":>5}')
+        for num_tareas in options['tareas']:
+            with transaccion_descartable():
+                cabañas = crear_cabañas(1)
+                cliente = crear_cliente()
+                reserva_anterior, reserva_nueva = crear_reservas(cabañas, cliente, 2)
+                crear_tareas(num_tareas)
+                # bulk_create no dispara las señales que invalidan el catálogo
+                cache_tareas.limpiar()
+                total = TareaPreparacion.objects.count()
+
+                preparacion, t_anterior, consultas_anterior = medir(
+                    lambda: iniciar_preparacion_anterior(reserva_anterior))
+                (preparacion_nueva, _), t_servicio, consultas_servicio = medir(
+                    lambda: iniciar_preparacion(reserva_nueva, estado='pendiente'))
+
+                creadas = (preparacion.items_preparacion.count(), preparacion_nueva.items_preparacion.count())
+                if creadas != (total, total):
+                    self.stdout.write(self.style.ERROR(f'Filas creadas distintas del catálogo: {creadas} de {total}'))
+                    return
+
+            self.stdout.write(f'{num_tareas:>7} {t_anterior * 1000:>9.1f} ms {consultas_anterior:>6} '
+                              f'{t_servicio * 1000:>9.1f} ms {consultas_servicio:>5}')
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gestion.alertas import enviar_recordatorios
+from gestion.models import Reserva, Notificacion
+from ._benchmark import (
+    transaccion_descartable, medir, crear_cabañas, crear_cliente, crear_reservas,
+)
+
+
+def enviar_recordatorios_anterior():
+    """Implementación anterior (views.enviar_recordatorio_confirmacion): dos INSERT por reserva"""
+    hoy = timezone.now().date()
+    fecha_objetivo = hoy + timedelta(days=4)
+
+    reservas_pendientes = Reserva.objects.filter(
+        fechaInicio=fecha_objetivo,
+        confirmacion_cliente=False,
+        estado='confirmada'
+    )
+
+    for reserva in reservas_pendientes:
+        reserva.generarAlerta()
+        if reserva.cliente.usuario:
+            Notificacion.objects.create(
+                usuario=reserva.cliente.usuario,
+                tipo='recordatorio',
+                mensaje=f'URGENTE: Confirme su reserva en {reserva.cabaña.nombre} que inicia en 4 días ({reserva.fechaInicio}). Acceda a "Mis Reservas" para confirmar.',
+                fechaEnvio=timezone.now()
+            )
+
+
+class Command(BaseCommand):
+    help = 'Mide el envío de recordatorios sobre reservas sintéticas (por defecto 100.000)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, nargs='+', default=[100000])
+        parser.add_argument('--max-anterior', type=int, default=10000,
+                            help='No medir la implementación anterior por sobre esta cantidad de reservas')
+
+    def handle(self, *args, **options):
+        hoy = timezone.now().date()
+
+        self.stdout.write(f'{"Reservas":>9} {"Enviados":>9} {"Anterior":>12} {"Envío":>10} '
+                          f'{"Reservas/s":>11} {"SQL":>5} {"Reejecución":>12} {"SQL":>5}')
+        for num_reservas in options['reservas']:
+            with transaccion_descartable():
+                cabañas = crear_cabañas(50)
+                cliente = crear_cliente()
+                cliente.usuario = User.objects.create_user(username='benchmark_recordatorios')
+                cliente.save()
+                # Inicios repartidos en los próximos 10 días: ~70% tiene algún recordatorio vigente
+                crear_reservas(cabañas, cliente, num_reservas, desde=hoy, horizonte=10)
+
+                anterior = '-'
+                if num_reservas <= options['max_anterior']:
+                    with transaccion_descartable():
+                        _, t_anterior, _ = medir(enviar_recordatorios_anterior)
+                    anterior = f'{t_anterior * 1000:.1f} ms'
+
+                enviadas, t_envio, consultas = medir(lambda: enviar_recordatorios(hoy))
+                repetidas, t_reenvio, consultas_reenvio = medir(lambda: enviar_recordatorios(hoy))
+                if sum(repetidas.values()):
+                    self.stdout.write(self.style.ERROR('La reejecución volvió a enviar recordatorios'))
+                    return
+
+            total = sum(enviadas.values())
+            self.stdout.write(f'{num_reservas:>9} {total:>9} {anterior:>12} {t_envio * 1000:>7.1f} ms '
+                              f'{num_reservas / t_envio:>11.0f} {consultas:>5} '
+                              f'{t_reenvio * 1000:>9.1f} ms {consultas_reenvio:>5}')
@@ -0,0 +1,37 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from gestion.alertas import enviar_recordatorios
+
+
+class Command(BaseCommand):
+    help = ('Envía los recordatorios de reservas confirmadas a 7, 4 y 3 días del inicio. '
+            'Es seguro ejecutarlo varias veces al día: las alertas ya enviadas no se repiten.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Día para el que se calculan los recordatorios (AAAA-MM-DD). Por defecto, hoy.')
+
+    def handle(self, *args, **options):
+        hoy = None
+        if options['fecha']:
+            try:
+                hoy = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Fecha inválida, use el formato AAAA-MM-DD.')
+
+        inicio = time.perf_counter()
+        try:
+            enviadas = enviar_recordatorios(hoy)
+        except IntegrityError:
+            raise CommandError('Otra ejecución registró las mismas alertas al mismo tiempo; no se envió nada. '
+                               'Vuelva a ejecutar el comando.')
+        segundos = time.perf_counter() - inicio
+
+        total = sum(enviadas.values())
+        detalle = ', '.join(f'{tipo}: {cantidad}' for tipo, cantidad in enviadas.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} recordatorios enviados ({detalle}) en {segundos:.2f} s'
+        ))
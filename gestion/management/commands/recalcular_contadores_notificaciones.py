@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from gestion.notificaciones import recalcular_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los contadores de notificaciones (total y no leídas) de cada usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, action='append', dest='usuarios',
+                            help='ID de usuario a recalcular (se puede repetir). Por defecto, todos.')
+
+    def handle(self, *args, **options):
+        total = recalcular_contadores(options['usuarios'])
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados para {total} usuarios con notificaciones'))
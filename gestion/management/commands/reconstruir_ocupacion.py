@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion.models import Cabaña
+from gestion.ocupacion import reconstruir_ocupacion
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero la tabla de ocupación diaria a partir de reservas y mantenimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cabaña', type=int, action='append', dest='cabañas',
+                            help='ID de cabaña a reconstruir (se puede repetir). Por defecto, todas.')
+
+    def handle(self, *args, **options):
+        cabaña_ids = options['cabañas']
+        if cabaña_ids is None:
+            cabaña_ids = list(Cabaña.objects.values_list('pk', flat=True))
+
+        inicio = time.perf_counter()
+        total = reconstruir_ocupacion(cabaña_ids)
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ocupación reconstruida para {len(cabaña_ids)} cabañas: '
+            f'{total} días ocupados en {segundos:.2f} s'
+        ))
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:37
+
+from datetime import date
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+ESTADOS_RESERVA_BLOQUEANTES = ['confirmada', 'pendiente']
+ESTADOS_MANTENIMIENTO_BLOQUEANTES = ['programado', 'en_proceso']
+
+
+def poblar_ocupacion(apps, schema_editor):
+    """
+    Pinta la ocupación de las reservas y mantenimientos existentes: un día de
+    mantenimiento por cada mantenimiento activo y los días de cada reserva activa,
+    que tienen prioridad; si dos reservas se solapan, queda la confirmada.
+    """
+    Reserva = apps.get_model('gestion', 'Reserva')
+    Mantenimiento = apps.get_model('gestion', 'Mantenimiento')
+    OcupacionDia = apps.get_model('gestion', 'OcupacionDia')
+
+    dias = {}
+    for cabaña_id, fecha in Mantenimiento.objects.filter(
+        estado__in=ESTADOS_MANTENIMIENTO_BLOQUEANTES,
+    ).values_list('cabaña_id', 'fechaProgramada'):
+        dias[cabaña_id, fecha] = ('mantenimiento', None)
+
+    reservas = sorted(
+        Reserva.objects.filter(estado__in=ESTADOS_RESERVA_BLOQUEANTES).values_list(
+            'idReserva', 'cabaña_id', 'fechaInicio', 'fechaFin', 'estado'),
+        key=lambda reserva: reserva[4] != 'confirmada',
+    )
+    pintados = set()
+    for reserva_id, cabaña_id, inicio, fin, _ in reservas:
+        for ordinal in range(inicio.toordinal(), fin.toordinal() + 1):
+            dia = (cabaña_id, date.fromordinal(ordinal))
+            if dia not in pintados:
+                pintados.add(dia)
+                dias[dia] = ('reservada', reserva_id)
+
+    OcupacionDia.objects.bulk_create([
+        OcupacionDia(cabaña_id=cabaña_id, fecha=fecha, estado=estado, reserva_id=reserva_id)
+        for (cabaña_id, fecha), (estado, reserva_id) in dias.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0008_eliminar_verificacion_inventario_preparacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionDia',
+            fields=[
+                ('idOcupacion', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(choices=[('reservada', 'Reservada'), ('mantenimiento', 'En Mantenimiento')], max_length=20)),
+                ('cabaña', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacion_dias', to='gestion.cabaña')),
+                ('reserva', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ocupacion_dias', to='gestion.reserva')),
+            ],
+            options={
+                'verbose_name': 'Ocupación Diaria',
+                'verbose_name_plural': 'Ocupación Diaria',
+                'db_table': 'ocupacion_dia',
+                'indexes': [models.Index(fields=['fecha', 'estado'], name='ocupacion_fecha_estado_idx')],
+                'unique_together': {('cabaña', 'fecha')},
+            },
+        ),
+        migrations.RunPython(poblar_ocupacion, migrations.RunPython.noop),
+    ]
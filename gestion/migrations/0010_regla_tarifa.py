@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_ocupacion_dia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReglaTarifa',
+            fields=[
+                ('idRegla', models.AutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('temporada', 'Temporada'), ('fin_semana', 'Recargo Fin de Semana'), ('estadia_larga', 'Descuento Estadía Larga')], max_length=20)),
+                ('nombre', models.CharField(blank=True, max_length=100, verbose_name='Nombre')),
+                ('fecha_inicio', models.DateField(blank=True, help_text='Vacío: sin límite inicial', null=True, verbose_name='Desde')),
+                ('fecha_fin', models.DateField(blank=True, help_text='Vacío: sin límite final', null=True, verbose_name='Hasta')),
+                ('precio_noche', models.DecimalField(blank=True, decimal_places=2, help_text='Solo temporadas: reemplaza el precio base de la cabaña', max_digits=10, null=True, verbose_name='Precio por Noche')),
+                ('porcentaje', models.DecimalField(decimal_places=2, default=0, help_text='Temporada: ajuste sobre el precio base (negativo para temporada baja). Fin de semana: recargo. Estadía larga: descuento sobre el total.', max_digits=5, verbose_name='Porcentaje')),
+                ('min_noches', models.IntegerField(default=0, help_text='Solo estadía larga: noches necesarias para aplicar el descuento', verbose_name='Mínimo de Noches')),
+                ('prioridad', models.IntegerField(default=0, help_text='Si dos temporadas se solapan, prevalece la de mayor prioridad', verbose_name='Prioridad')),
+                ('activa', models.BooleanField(default=True, verbose_name='Activa')),
+                ('cabaña', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reglas_tarifa', to='gestion.cabaña')),
+            ],
+            options={
+                'verbose_name': 'Regla de Tarifa',
+                'verbose_name_plural': 'Reglas de Tarifa',
+                'db_table': 'regla_tarifa',
+                'ordering': ['cabaña', 'tipo', 'prioridad', 'fecha_inicio'],
+            },
+        ),
+    ]
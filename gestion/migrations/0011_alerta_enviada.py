@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_regla_tarifa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaEnviada',
+            fields=[
+                ('idAlerta', models.AutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('aviso_7_dias', 'Aviso 7 días antes'), ('confirmacion_4_dias', 'Confirmación 4 días antes'), ('aviso_3_dias', 'Aviso 3 días antes')], max_length=30)),
+                ('fecha', models.DateField(help_text='Fecha de inicio de la reserva a la que corresponde la alerta', verbose_name='Fecha de Inicio Avisada')),
+                ('fechaRegistro', models.DateTimeField(auto_now_add=True)),
+                ('reserva', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas_enviadas', to='gestion.reserva')),
+            ],
+            options={
+                'verbose_name': 'Alerta Enviada',
+                'verbose_name_plural': 'Alertas Enviadas',
+                'db_table': 'alerta_enviada',
+                'unique_together': {('reserva', 'tipo', 'fecha')},
+            },
+        ),
+    ]
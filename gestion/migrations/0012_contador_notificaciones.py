@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def inicializar_contadores(apps, schema_editor):
+    """Cuenta las notificaciones existentes de cada usuario"""
+    Notificacion = apps.get_model('gestion', 'Notificacion')
+    ContadorNotificaciones = apps.get_model('gestion', 'ContadorNotificaciones')
+
+    ContadorNotificaciones.objects.bulk_create([
+        ContadorNotificaciones(usuario_id=usuario_id, total=total, no_leidas=no_leidas)
+        for usuario_id, total, no_leidas in Notificacion.objects.filter(usuario__isnull=False).order_by().values(
+            'usuario_id').annotate(
+            total=Count('idNotificacion'),
+            no_leidas=Count('idNotificacion', filter=Q(leida=False)),
+        ).values_list('usuario_id', 'total', 'no_leidas')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('gestion', '0011_alerta_enviada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNotificaciones',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador_notificaciones', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('no_leidas', models.IntegerField(default=0, verbose_name='No Leídas')),
+            ],
+            options={
+                'verbose_name': 'Contador de Notificaciones',
+                'verbose_name_plural': 'Contadores de Notificaciones',
+                'db_table': 'contador_notificaciones',
+            },
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0012_contador_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'leida', 'fechaEnvio'], name='notif_usuario_leida_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['fechaEnvio', 'idNotificacion'], name='notif_fecha_id_idx'),
+        ),
+    ]
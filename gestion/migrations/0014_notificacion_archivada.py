@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gestion', '0013_indices_notificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('idNotificacion', models.IntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('alerta', 'Alerta'), ('confirmacion', 'Confirmación'), ('preparacion', 'Preparación'), ('recordatorio', 'Recordatorio'), ('general', 'General')], max_length=20)),
+                ('mensaje', models.TextField()),
+                ('fechaEnvio', models.DateTimeField()),
+                ('fechaArchivo', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_archivadas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notificación Archivada',
+                'verbose_name_plural': 'Notificaciones Archivadas',
+                'db_table': 'notificacion_archivada',
+                'ordering': ['-fechaEnvio'],
+            },
+        ),
+    ]
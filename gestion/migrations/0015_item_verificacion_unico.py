@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:58
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def eliminar_duplicados(apps, schema_editor):
+    """Deja una sola verificación por (entrega, item): la primera creada"""
+    ItemVerificacion = apps.get_model('gestion', 'ItemVerificacion')
+
+    duplicados = ItemVerificacion.objects.order_by().values('entrega_id', 'item_id').annotate(
+        filas=Count('idItemVerificacion'),
+        primera=Min('idItemVerificacion'),
+    ).filter(filas__gt=1)
+
+    for grupo in duplicados.iterator():
+        ItemVerificacion.objects.filter(
+            entrega_id=grupo['entrega_id'],
+            item_id=grupo['item_id'],
+        ).exclude(idItemVerificacion=grupo['primera']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0014_notificacion_archivada'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_duplicados, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='itemverificacion',
+            unique_together={('entrega', 'item')},
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+CAMPOS_CHECKLIST = ('nombre_item', 'categoria', 'orden', 'cantidad_esperada', 'es_obligatorio', 'precio_reposicion')
+
+
+def copiar_checklist(apps, schema_editor):
+    """Copia en cada verificación existente los datos actuales de su item del checklist"""
+    ChecklistInventario = apps.get_model('gestion', 'ChecklistInventario')
+    ItemVerificacion = apps.get_model('gestion', 'ItemVerificacion')
+
+    item = ChecklistInventario.objects.filter(pk=OuterRef('item_id'))
+    ItemVerificacion.objects.update(**{
+        campo: Subquery(item.values(campo)[:1]) for campo in CAMPOS_CHECKLIST
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0015_item_verificacion_unico'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='itemverificacion',
+            options={'ordering': ['entrega', 'orden', 'categoria', 'nombre_item'], 'verbose_name': 'Item de Verificación', 'verbose_name_plural': 'Items de Verificación'},
+        ),
+        migrations.AddField(
+            model_name='itemverificacion',
+            name='cantidad_esperada',
+            field=models.IntegerField(default=1, verbose_name='Cantidad Esperada'),
+        ),
+        migrations.AddField(
+            model_name='itemverificacion',
+            name='categoria',
+            field=models.CharField(choices=[('cocina', 'Cocina'), ('baño', 'Baño'), ('dormitorio', 'Dormitorio'), ('sala', 'Sala'), ('exterior', 'Exterior'), ('otros', 'Otros')], default='otros', max_length=50, verbose_name='Categoría'),
+        ),
+        migrations.AddField(
+            model_name='itemverificacion',
+            name='es_obligatorio',
+            field=models.BooleanField(default=True, verbose_name='Es Obligatorio'),
+        ),
+        migrations.AddField(
+            model_name='itemverificacion',
+            name='nombre_item',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Nombre del Item'),
+        ),
+        migrations.AddField(
+            model_name='itemverificacion',
+            name='orden',
+            field=models.IntegerField(default=0, verbose_name='Orden'),
+        ),
+        migrations.AddField(
+            model_name='itemverificacion',
+            name='precio_reposicion',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10, verbose_name='Precio Reposición'),
+        ),
+        migrations.RunPython(copiar_checklist, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='itemverificacion',
+            index=models.Index(fields=['entrega', 'orden', 'categoria', 'nombre_item'], name='item_verif_entrega_orden_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0016_item_verificacion_copia_checklist'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entregacabaña',
+            index=models.Index(fields=['fecha_entrega', 'idEntrega'], name='entrega_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entregacabaña',
+            index=models.Index(fields=['estado', 'fecha_entrega', 'idEntrega'], name='entrega_estado_fecha_id_idx'),
+        ),
+    ]
@@ -1,8 +1,31 @@
 from django.db import models
-from django.db.models import Q
+from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
+from .disponibilidad import cabaña_libre
+
+
+class ValoresOriginalesMixin:
+    """Conserva los valores leídos de la base de datos para detectar cambios en las señales"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._valores_originales = dict(zip(field_names, values))
+        return instancia
+
+    def valor_original(self, campo):
+        """Valor del campo (attname) tal como se leyó o guardó por última vez"""
+        return getattr(self, '_valores_originales', {}).get(campo)
+
+    def registrar_valores_actuales(self):
+        """Toma los valores actuales como nuevos originales (tras guardar)"""
+        self._valores_originales = {
+            campo.attname: self.__dict__[campo.attname]
+            for campo in self._meta.concrete_fields
+            if campo.attname in self.__dict__
+        }
 
 
 class Cliente(models.Model):
@@ -14,6 +37,7 @@ class Cliente(models.Model):
     direccion = models.TextField()
     tipoCliente = models.CharField(max_length=50, default='Regular')
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='cliente')
+    modificado = models.DateTimeField(auto_now=True)
 
     def solicitarReserva(self):
         """Método para solicitar una reserva"""
@@ -53,6 +77,7 @@ class Cabaña(models.Model):
     capacidad = models.IntegerField()
     estado = models.CharField(max_length=20, choices=ESTADOS, default='disponible')
     precioNoche = models.DecimalField(max_digits=10, decimal_places=2)
+    modificado = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.nombre} (Cap: {self.capacidad})"
@@ -63,7 +88,58 @@ class Cabaña(models.Model):
         verbose_name_plural = "Cabañas"
 
 
-class Reserva(models.Model):
+class ReglaTarifa(models.Model):
+    """Regla de tarifa de una cabaña: temporadas, recargo de fin de semana y descuento por estadía larga"""
+    TIPOS = [
+        ('temporada', 'Temporada'),
+        ('fin_semana', 'Recargo Fin de Semana'),
+        ('estadia_larga', 'Descuento Estadía Larga'),
+    ]
+
+    idRegla = models.AutoField(primary_key=True)
+    cabaña = models.ForeignKey(Cabaña, on_delete=models.CASCADE, related_name='reglas_tarifa')
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    nombre = models.CharField(max_length=100, blank=True, verbose_name='Nombre')
+    fecha_inicio = models.DateField(null=True, blank=True, verbose_name='Desde',
+                                    help_text='Vacío: sin límite inicial')
+    fecha_fin = models.DateField(null=True, blank=True, verbose_name='Hasta',
+                                 help_text='Vacío: sin límite final')
+    precio_noche = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                       verbose_name='Precio por Noche',
+                                       help_text='Solo temporadas: reemplaza el precio base de la cabaña')
+    porcentaje = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name='Porcentaje',
+                                     help_text='Temporada: ajuste sobre el precio base (negativo para temporada baja). '
+                                               'Fin de semana: recargo. Estadía larga: descuento sobre el total.')
+    min_noches = models.IntegerField(default=0, verbose_name='Mínimo de Noches',
+                                     help_text='Solo estadía larga: noches necesarias para aplicar el descuento')
+    prioridad = models.IntegerField(default=0, verbose_name='Prioridad',
+                                    help_text='Si dos temporadas se solapan, prevalece la de mayor prioridad')
+    activa = models.BooleanField(default=True, verbose_name='Activa')
+
+    def aplica_en(self, fecha):
+        """Indica si la regla está vigente en la fecha"""
+        return ((self.fecha_inicio is None or self.fecha_inicio <= fecha) and
+                (self.fecha_fin is None or fecha <= self.fecha_fin))
+
+    def clean(self):
+        if self.fecha_inicio and self.fecha_fin and self.fecha_fin < self.fecha_inicio:
+            raise ValidationError('La fecha de término debe ser posterior a la de inicio.')
+        if self.tipo == 'temporada' and self.precio_noche is None and not self.porcentaje:
+            raise ValidationError('Una temporada necesita un precio por noche o un porcentaje.')
+        if self.tipo == 'estadia_larga' and self.min_noches <= 0:
+            raise ValidationError('El descuento por estadía larga necesita un mínimo de noches.')
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.nombre or self.cabaña.nombre}"
+
+    class Meta:
+        db_table = 'regla_tarifa'
+        verbose_name = "Regla de Tarifa"
+        verbose_name_plural = "Reglas de Tarifa"
+        ordering = ['cabaña', 'tipo', 'prioridad', 'fecha_inicio']
+
+
+class Reserva(ValoresOriginalesMixin, models.Model):
     """Modelo para reservas de cabañas"""
     ESTADOS = [
         ('pendiente', 'Pendiente'),
@@ -85,6 +161,7 @@ class Reserva(models.Model):
     # Nuevos campos para confirmación del cliente
     confirmacion_cliente = models.BooleanField(default=False, verbose_name='Confirmación Cliente')
     fecha_confirmacion = models.DateTimeField(null=True, blank=True, verbose_name='Fecha Confirmación')
+    modificado = models.DateTimeField(auto_now=True)
 
     def registrarReserva(self):
         """Registra una nueva reserva"""
@@ -100,32 +177,9 @@ class Reserva(models.Model):
         self.save()
 
     def generarAlerta(self):
-        """Genera alertas para reservas próximas - Actualizado para 4 días exactos"""
-        hoy = timezone.now().date()
-        dias_restantes = (self.fechaInicio - hoy).days
-
-        # Alerta a 4 días exactos para confirmación
-        if dias_restantes == 4 and not self.confirmacion_cliente:
-            Notificacion.objects.create(
-                usuario=self.cliente.usuario if self.cliente.usuario else None,
-                tipo='recordatorio',
-                mensaje=f'Por favor confirme su reserva en {self.cabaña.nombre} que inicia en 4 días. Fecha: {self.fechaInicio}',
-                fechaEnvio=timezone.now()
-            )
-        elif dias_restantes == 7:
-            Notificacion.objects.create(
-                usuario=self.cliente.usuario if self.cliente.usuario else None,
-                tipo='alerta',
-                mensaje=f'Su reserva en {self.cabaña.nombre} es en 7 días',
-                fechaEnvio=timezone.now()
-            )
-        elif dias_restantes == 3:
-            Notificacion.objects.create(
-                usuario=self.cliente.usuario if self.cliente.usuario else None,
-                tipo='alerta',
-                mensaje=f'Su reserva en {self.cabaña.nombre} es en 3 días',
-                fechaEnvio=timezone.now()
-            )
+        """Envía las alertas que correspondan hoy a esta reserva, si no se enviaron antes"""
+        from .alertas import enviar_recordatorios
+        return enviar_recordatorios(reservas=[self.pk])
 
     def confirmar_reserva_cliente(self):
         """Confirma la reserva por parte del cliente"""
@@ -136,36 +190,12 @@ class Reserva(models.Model):
     @staticmethod
     def verificar_disponibilidad_cabaña(cabaña, fecha_inicio, fecha_fin):
         """Verifica disponibilidad de cabaña considerando mantenimientos"""
-        # Verificar si hay mantenimientos activos en el rango de fechas
-        mantenimientos = Mantenimiento.objects.filter(
-            cabaña=cabaña,
-            fechaProgramada__lte=fecha_fin,
-            estado__in=['programado', 'en_proceso']
-        )
-
-        # Si hay un mantenimiento programado, verificar si hay fecha de ejecución
-        for mantenimiento in mantenimientos:
-            # Si no tiene fecha de ejecución, asumir que el mantenimiento afecta toda la fecha programada
-            if not mantenimiento.fechaEjecucion:
-                if mantenimiento.fechaProgramada <= fecha_fin:
-                    return False
-            # Si tiene fecha de ejecución, verificar si se solapa
-            elif mantenimiento.fechaEjecucion >= fecha_inicio:
-                return False
-
         # Verificar si la cabaña está en mantenimiento
         if cabaña.estado == 'mantenimiento':
             return False
 
-        # Verificar reservas existentes
-        reservas_existentes = Reserva.objects.filter(
-            cabaña=cabaña,
-            estado__in=['confirmada', 'pendiente'],
-        ).filter(
-            Q(fechaInicio__lte=fecha_fin) & Q(fechaFin__gte=fecha_inicio)
-        )
-
-        return not reservas_existentes.exists()
+        # Reservas y mantenimientos activos que se solapen, siempre contra la base de datos
+        return cabaña_libre(cabaña.pk, fecha_inicio, fecha_fin)
 
     def enviarNotificacionPreparacion(self):
         """Envía notificación de preparación"""
@@ -316,7 +346,7 @@ class PrestamoImplemento(models.Model):
         verbose_name_plural = "Préstamos de Implementos"
 
 
-class Mantenimiento(models.Model):
+class Mantenimiento(ValoresOriginalesMixin, models.Model):
     """Modelo para mantenimientos de cabañas"""
     TIPOS = [
         ('preventivo', 'Preventivo'),
@@ -339,6 +369,7 @@ class Mantenimiento(models.Model):
     fechaProgramada = models.DateField()
     fechaEjecucion = models.DateField(null=True, blank=True)
     estado = models.CharField(max_length=20, choices=ESTADOS, default='programado')
+    modificado = models.DateTimeField(auto_now=True)
 
     def registrarMantenimiento(self):
         """Registra un mantenimiento"""
@@ -369,7 +400,33 @@ class Mantenimiento(models.Model):
         ordering = ['fechaProgramada']
 
 
-class Notificacion(models.Model):
+class OcupacionDia(models.Model):
+    """Ocupación materializada por cabaña y día, derivada de reservas y mantenimientos"""
+    ESTADOS = [
+        ('reservada', 'Reservada'),
+        ('mantenimiento', 'En Mantenimiento'),
+    ]
+
+    idOcupacion = models.AutoField(primary_key=True)
+    cabaña = models.ForeignKey(Cabaña, on_delete=models.CASCADE, related_name='ocupacion_dias')
+    fecha = models.DateField()
+    estado = models.CharField(max_length=20, choices=ESTADOS)
+    reserva = models.ForeignKey(Reserva, on_delete=models.CASCADE, null=True, blank=True, related_name='ocupacion_dias')
+
+    def __str__(self):
+        return f"{self.cabaña_id} - {self.fecha} - {self.estado}"
+
+    class Meta:
+        db_table = 'ocupacion_dia'
+        verbose_name = "Ocupación Diaria"
+        verbose_name_plural = "Ocupación Diaria"
+        unique_together = ['cabaña', 'fecha']
+        indexes = [
+            models.Index(fields=['fecha', 'estado'], name='ocupacion_fecha_estado_idx'),
+        ]
+
+
+class Notificacion(ValoresOriginalesMixin, models.Model):
     """Modelo para notificaciones del sistema"""
     TIPOS = [
         ('alerta', 'Alerta'),
@@ -403,9 +460,74 @@ class Notificacion(models.Model):
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
         ordering = ['-fechaEnvio']
+        indexes = [
+            models.Index(fields=['usuario', 'leida', 'fechaEnvio'], name='notif_usuario_leida_fecha_idx'),
+            models.Index(fields=['fechaEnvio', 'idNotificacion'], name='notif_fecha_id_idx'),
+        ]
+
+
+class NotificacionArchivada(models.Model):
+    """Notificación leída y antigua retirada de la tabla principal (ver archivar_notificaciones)"""
+    idNotificacion = models.IntegerField(primary_key=True)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notificaciones_archivadas',
+                                null=True, blank=True)
+    tipo = models.CharField(max_length=20, choices=Notificacion.TIPOS)
+    mensaje = models.TextField()
+    fechaEnvio = models.DateTimeField()
+    fechaArchivo = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Notificación archivada #{self.idNotificacion} - {self.tipo} - {self.usuario}"
+
+    class Meta:
+        db_table = 'notificacion_archivada'
+        verbose_name = "Notificación Archivada"
+        verbose_name_plural = "Notificaciones Archivadas"
+        ordering = ['-fechaEnvio']
+
 
+class ContadorNotificaciones(models.Model):
+    """Totales de notificaciones por usuario, mantenidos al crear, marcar y eliminar notificaciones"""
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='contador_notificaciones')
+    total = models.IntegerField(default=0)
+    no_leidas = models.IntegerField(default=0, verbose_name='No Leídas')
+
+    def __str__(self):
+        return f"{self.usuario} - {self.no_leidas}/{self.total}"
+
+    class Meta:
+        db_table = 'contador_notificaciones'
+        verbose_name = "Contador de Notificaciones"
+        verbose_name_plural = "Contadores de Notificaciones"
 
-class ChecklistInventario(models.Model):
+
+class AlertaEnviada(models.Model):
+    """Registro de alertas ya enviadas por reserva, para no repetirlas"""
+    TIPOS = [
+        ('aviso_7_dias', 'Aviso 7 días antes'),
+        ('confirmacion_4_dias', 'Confirmación 4 días antes'),
+        ('aviso_3_dias', 'Aviso 3 días antes'),
+    ]
+
+    idAlerta = models.AutoField(primary_key=True)
+    reserva = models.ForeignKey(Reserva, on_delete=models.CASCADE, related_name='alertas_enviadas')
+    tipo = models.CharField(max_length=30, choices=TIPOS)
+    fecha = models.DateField(verbose_name='Fecha de Inicio Avisada',
+                             help_text='Fecha de inicio de la reserva a la que corresponde la alerta')
+    fechaRegistro = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - Reserva #{self.reserva_id} ({self.fecha})"
+
+    class Meta:
+        db_table = 'alerta_enviada'
+        verbose_name = "Alerta Enviada"
+        verbose_name_plural = "Alertas Enviadas"
+        unique_together = ['reserva', 'tipo', 'fecha']
+
+
+class ChecklistInventario(ValoresOriginalesMixin, models.Model):
     """Modelo para checklist de inventario por cabaña"""
     CATEGORIAS = [
         ('cocina', 'Cocina'),
@@ -499,6 +621,10 @@ class EntregaCabaña(models.Model):
         verbose_name = "Entrega de Cabaña"
         verbose_name_plural = "Entregas de Cabañas"
         ordering = ['-fecha_entrega']
+        indexes = [
+            models.Index(fields=['fecha_entrega', 'idEntrega'], name='entrega_fecha_id_idx'),
+            models.Index(fields=['estado', 'fecha_entrega', 'idEntrega'], name='entrega_estado_fecha_id_idx'),
+        ]
 
 
 class ItemVerificacion(models.Model):
@@ -510,9 +636,22 @@ class ItemVerificacion(models.Model):
         ('faltante', 'Faltante'),
     ]
 
+    # Campos copiados del ChecklistInventario al instanciar la verificación
+    CAMPOS_CHECKLIST = ('nombre_item', 'categoria', 'orden', 'cantidad_esperada', 'es_obligatorio', 'precio_reposicion')
+
     idItemVerificacion = models.AutoField(primary_key=True)
     entrega = models.ForeignKey(EntregaCabaña, on_delete=models.CASCADE, related_name='items_verificacion')
     item = models.ForeignKey(ChecklistInventario, on_delete=models.CASCADE, related_name='verificaciones')
+    # Copia del item del checklist al instanciar la entrega: las vistas y los cargos
+    # no necesitan el join y los cambios posteriores al checklist no alteran el historial
+    nombre_item = models.CharField(max_length=100, blank=True, verbose_name='Nombre del Item')
+    categoria = models.CharField(max_length=50, choices=ChecklistInventario.CATEGORIAS, default='otros',
+                                 verbose_name='Categoría')
+    orden = models.IntegerField(default=0, verbose_name='Orden')
+    cantidad_esperada = models.IntegerField(default=1, verbose_name='Cantidad Esperada')
+    es_obligatorio = models.BooleanField(default=True, verbose_name='Es Obligatorio')
+    precio_reposicion = models.DecimalField(max_digits=10, decimal_places=2, default=0.00,
+                                            verbose_name='Precio Reposición')
     cantidad_entregada = models.IntegerField(default=0, verbose_name='Cantidad Entregada')
     cantidad_devuelta = models.IntegerField(default=0, verbose_name='Cantidad Devuelta')
     estado_entregado = models.CharField(max_length=20, choices=ESTADOS, default='bueno', verbose_name='Estado Entregado')
@@ -522,31 +661,31 @@ class ItemVerificacion(models.Model):
     observaciones = models.TextField(blank=True, verbose_name='Observaciones')
 
     def calcular_cargo(self):
-        """Calcula el cargo por faltantes o daños"""
-        cargo = 0
-        if self.cantidad_devuelta < self.cantidad_entregada:
-            faltantes = self.cantidad_entregada - self.cantidad_devuelta
-            cargo += faltantes * self.item.precio_reposicion
-
-        if self.estado_devuelto == 'danado' and self.cantidad_devuelta > 0:
-            cargo += (self.cantidad_devuelta * self.item.precio_reposicion * 0.5)  # 50% del valor por daño
-
-        if self.estado_devuelto == 'regular' and self.cantidad_devuelta > 0:
-            cargo += (self.cantidad_devuelta * self.item.precio_reposicion * 0.2)  # 20% del valor por estado regular
-
+        """
+        Calcula el cargo por faltantes o daños de esta verificación. Para una
+        entrega completa usar ``gestion.entregas.aplicar_cargos`` (un solo UPDATE).
+        """
+        from .entregas import cargo_item
+
+        cargo = cargo_item(self.cantidad_entregada, self.cantidad_devuelta,
+                           self.estado_devuelto, self.precio_reposicion)
         self.cargo_aplicado = cargo
         self.requiere_reposicion = cargo > 0
         self.save()
         return cargo
 
     def __str__(self):
-        return f"Verificación: {self.item.nombre_item} - Entrega #{self.entrega.idEntrega}"
+        return f"Verificación: {self.nombre_item} - Entrega #{self.entrega_id}"
 
     class Meta:
         db_table = 'item_verificacion'
         verbose_name = "Item de Verificación"
         verbose_name_plural = "Items de Verificación"
-        ordering = ['entrega', 'item__orden', 'item__categoria']
+        ordering = ['entrega', 'orden', 'categoria', 'nombre_item']
+        unique_together = [['entrega', 'item']]
+        indexes = [
+            models.Index(fields=['entrega', 'orden', 'categoria', 'nombre_item'], name='item_verif_entrega_orden_idx'),
+        ]
 
 
 
@@ -578,6 +717,24 @@ class TareaPreparacion(models.Model):
         ordering = ['categoria', 'orden', 'nombre']
 
 
+def calcular_porcentaje(completadas, total):
+    """Porcentaje entero de avance (0 si no hay tareas)"""
+    if not total:
+        return 0
+    return int((completadas / total) * 100)
+
+
+class PreparacionCabañaQuerySet(models.QuerySet):
+    def con_avance(self):
+        """Anota total_tareas y tareas_completadas con un solo conteo condicional por fila"""
+        return self.annotate(
+            total_tareas=models.Count('items_preparacion'),
+            tareas_completadas=models.Count(
+                'items_preparacion', filter=models.Q(items_preparacion__completado=True)
+            ),
+        )
+
+
 class PreparacionCabaña(models.Model):
     """Modelo para registro de preparación de cabañas para reservas"""
     ESTADOS = [
@@ -596,13 +753,20 @@ class PreparacionCabaña(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', verbose_name='Estado')
     observaciones = models.TextField(blank=True, verbose_name='Observaciones')
 
+    objects = PreparacionCabañaQuerySet.as_manager()
+
     def porcentaje_completado(self):
-        """Calcula el porcentaje de tareas completadas"""
-        total = self.items_preparacion.count()
-        if total == 0:
-            return 0
-        completadas = self.items_preparacion.filter(completado=True).count()
-        return int((completadas / total) * 100)
+        """
+        Calcula el porcentaje de tareas completadas. Usa los conteos anotados por
+        ``con_avance()`` si están; si no, los consulta.
+        """
+        if hasattr(self, 'total_tareas'):
+            return calcular_porcentaje(self.tareas_completadas, self.total_tareas)
+        conteos = self.items_preparacion.aggregate(
+            total=models.Count('pk'),
+            completadas=models.Count('pk', filter=models.Q(completado=True)),
+        )
+        return calcular_porcentaje(conteos['completadas'], conteos['total'])
 
     def __str__(self):
         return f"Preparación #{self.idPreparacion} - {self.reserva.cabaña.nombre} - Reserva #{self.reserva.idReserva}"
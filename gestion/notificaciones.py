@@ -0,0 +1,279 @@
+"""
+Envío masivo de notificaciones.
+
+``notificar`` resuelve los destinatarios (usuarios, un grupo o un rol) con una
+consulta y escribe todas las filas con un solo ``bulk_create``. Con
+``diferir=True`` la escritura se hace al confirmar la transacción en curso (en
+la misma petición), para no anunciar cambios que terminen revirtiéndose.
+
+Cada usuario tiene un ``ContadorNotificaciones`` con su total y sus no leídas.
+Las señales lo ajustan al crear, marcar o eliminar notificaciones una a una;
+las operaciones en bloque no emiten señales por fila y llaman a
+``ajustar_contadores`` una sola vez dentro de su misma transacción.
+Un usuario sin contador no tiene notificaciones.
+
+Los paneles se paginan por cursor sobre (fechaEnvio, idNotificacion) con
+``gestion.paginacion``: la página N cuesta lo mismo que la primera.
+"""
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q, F, Sum, Count, Max
+from django.utils import timezone
+
+from .paginacion import paginar_por_clave
+
+TAMAÑO_PAGINA_NOTIFICACIONES = 50
+
+# Ids por cada UPDATE de marcar_notificaciones
+LOTE_MARCADO = 500
+
+# Rol: condición sobre User que lo define (los mismos criterios que gestion.decorators)
+ROLES = {
+    'administradores': Q(is_staff=True),
+    'encargados': Q(is_staff=True) | Q(groups__name='Encargados'),
+    'clientes': Q(cliente__isnull=False),
+}
+
+def resolver_destinatarios(usuarios=None, grupo=None, rol=None):
+    """Ids de usuario de los destinatarios: lista de usuarios (o ids), nombre de grupo o rol de ``ROLES``"""
+    if usuarios is not None:
+        ids = [u.pk if isinstance(u, User) else u for u in usuarios]
+        return list(dict.fromkeys(i for i in ids if i is not None))
+
+    if grupo is not None:
+        condicion = Q(groups__name=grupo)
+    elif rol is not None:
+        if rol not in ROLES:
+            raise ValueError(f'Rol de destinatarios desconocido: {rol}')
+        condicion = ROLES[rol]
+    else:
+        raise ValueError('Indique usuarios, grupo o rol como destinatarios.')
+
+    return list(User.objects.filter(condicion, is_active=True).distinct().values_list('pk', flat=True))
+
+
+def ajustar_contadores(deltas):
+    """
+    Suma a los contadores ``{id de usuario: (Δ total, Δ no leídas)}``.
+
+    Crea los contadores que falten y luego hace un UPDATE por cada par de
+    deltas distinto (en un envío masivo todos los usuarios comparten el mismo).
+    """
+    from .models import ContadorNotificaciones
+
+    por_delta = defaultdict(list)
+    for usuario_id, delta in deltas.items():
+        if usuario_id is not None and delta != (0, 0):
+            por_delta[delta].append(usuario_id)
+    if not por_delta:
+        return
+
+    with transaction.atomic():
+        ContadorNotificaciones.objects.bulk_create(
+            [ContadorNotificaciones(usuario_id=usuario_id) for ids in por_delta.values() for usuario_id in ids],
+            ignore_conflicts=True,
+        )
+        for (delta_total, delta_no_leidas), ids in por_delta.items():
+            ContadorNotificaciones.objects.filter(usuario_id__in=ids).update(
+                total=F('total') + delta_total,
+                no_leidas=F('no_leidas') + delta_no_leidas,
+            )
+
+
+def deltas_de(notificaciones, signo=1):
+    """Deltas de contador que corresponden a crear (signo 1) o eliminar (signo -1) las notificaciones"""
+    deltas = {}
+    for notificacion in notificaciones:
+        total, no_leidas = deltas.get(notificacion.usuario_id, (0, 0))
+        deltas[notificacion.usuario_id] = (total + signo, no_leidas + (0 if notificacion.leida else signo))
+    return deltas
+
+
+def recalcular_contadores(usuario_ids=None):
+    """Recalcula desde cero los contadores (de todos los usuarios o de los indicados)"""
+    from .models import Notificacion, ContadorNotificaciones
+
+    notificaciones = Notificacion.objects.filter(usuario__isnull=False)
+    contadores = ContadorNotificaciones.objects.all()
+    if usuario_ids is not None:
+        notificaciones = notificaciones.filter(usuario_id__in=usuario_ids)
+        contadores = contadores.filter(usuario_id__in=usuario_ids)
+
+    filas = [
+        ContadorNotificaciones(usuario_id=usuario_id, total=total, no_leidas=no_leidas)
+        for usuario_id, total, no_leidas in notificaciones.order_by().values('usuario_id').annotate(
+            total=Count('idNotificacion'),
+            no_leidas=Count('idNotificacion', filter=Q(leida=False)),
+        ).values_list('usuario_id', 'total', 'no_leidas')
+    ]
+    with transaction.atomic():
+        contadores.delete()
+        ContadorNotificaciones.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def totales_notificaciones(usuario=None):
+    """
+    (total, no leídas) de un usuario, leyendo solo su contador. Sin usuario,
+    los de todo el sistema: suma de contadores más las notificaciones sin usuario.
+    """
+    from .models import Notificacion, ContadorNotificaciones
+
+    if usuario is not None:
+        contador = ContadorNotificaciones.objects.filter(usuario_id=usuario.pk).values_list(
+            'total', 'no_leidas').first()
+        return contador or (0, 0)
+
+    sumas = ContadorNotificaciones.objects.aggregate(total=Sum('total'), no_leidas=Sum('no_leidas'))
+    sin_usuario = Notificacion.objects.filter(usuario__isnull=True).aggregate(
+        total=Count('idNotificacion'), no_leidas=Count('idNotificacion', filter=Q(leida=False)))
+    return ((sumas['total'] or 0) + sin_usuario['total'],
+            (sumas['no_leidas'] or 0) + sin_usuario['no_leidas'])
+
+
+def _conteos_por_usuario(notificaciones):
+    """{id de usuario: (total, no leídas)} de las notificaciones del queryset, en una consulta"""
+    return {
+        usuario_id: (total, no_leidas)
+        for usuario_id, total, no_leidas in notificaciones.order_by().values('usuario_id').annotate(
+            total=Count('idNotificacion'),
+            no_leidas=Count('idNotificacion', filter=Q(leida=False)),
+        ).values_list('usuario_id', 'total', 'no_leidas')
+    }
+
+
+def marcar_notificaciones(notificaciones, leida=True):
+    """
+    Marca como leídas (o no leídas) las notificaciones del queryset; devuelve
+    cuántas cambiaron.
+
+    Las filas que cambian se bloquean y se leen una sola vez, y el UPDATE se
+    hace por esos ids en lotes de ``LOTE_MARCADO``, de modo que el ajuste de los
+    contadores corresponde exactamente a lo marcado.
+    """
+    from .models import Notificacion
+
+    signo = -1 if leida else 1
+    with transaction.atomic():
+        filas = list(notificaciones.exclude(leida=leida).select_for_update().order_by().values_list(
+            'idNotificacion', 'usuario_id'))
+        deltas = {}
+        for _, usuario_id in filas:
+            deltas[usuario_id] = (0, deltas.get(usuario_id, (0, 0))[1] + signo)
+
+        for desde in range(0, len(filas), LOTE_MARCADO):
+            ids = [fila[0] for fila in filas[desde:desde + LOTE_MARCADO]]
+            Notificacion.objects.filter(idNotificacion__in=ids).update(leida=leida)
+        ajustar_contadores(deltas)
+    return len(filas)
+
+
+def eliminar_notificaciones(notificaciones):
+    """
+    Elimina las notificaciones del queryset con un solo DELETE; devuelve cuántas
+    se eliminaron.
+
+    Los contadores se ajustan con los conteos por usuario leídos en la misma
+    transacción. El DELETE no pasa por el ``Collector``: ninguna tabla depende de
+    ``Notificacion`` y la señal por fila volvería a ajustar los contadores.
+    """
+    with transaction.atomic():
+        deltas = {
+            usuario_id: (-total, -no_leidas)
+            for usuario_id, (total, no_leidas) in _conteos_por_usuario(notificaciones).items()
+        }
+        eliminadas = notificaciones.order_by()._raw_delete(notificaciones.db)
+        ajustar_contadores(deltas)
+    return eliminadas
+
+
+def archivar_lote(antes_de, tamaño=1000):
+    """
+    Archiva hasta ``tamaño`` notificaciones leídas enviadas antes de ``antes_de``.
+
+    Lee, copia y elimina en una transacción corta, para no retener el bloqueo de
+    escritura de SQLite más que lo que toma un lote. La eliminación repite el
+    filtro, así que una notificación que dejó de cumplirlo no se borra, y la
+    copia ignora las ya archivadas por otra ejecución. Devuelve cuántas archivó.
+    """
+    from .models import Notificacion, NotificacionArchivada
+
+    archivables = Notificacion.objects.filter(leida=True, fechaEnvio__lt=antes_de)
+    ahora = timezone.now()
+    with transaction.atomic():
+        filas = list(archivables.select_for_update().order_by('idNotificacion').values_list(
+            'idNotificacion', 'usuario_id', 'tipo', 'mensaje', 'fechaEnvio')[:tamaño])
+        if not filas:
+            return 0
+
+        NotificacionArchivada.objects.bulk_create([
+            NotificacionArchivada(idNotificacion=notificacion_id, usuario_id=usuario_id, tipo=tipo,
+                                  mensaje=mensaje, fechaEnvio=fecha_envio, fechaArchivo=ahora)
+            for notificacion_id, usuario_id, tipo, mensaje, fecha_envio in filas
+        ], ignore_conflicts=True)
+        return eliminar_notificaciones(archivables.filter(idNotificacion__in=[fila[0] for fila in filas]))
+
+
+def _crear_notificaciones(mensaje, tipo, usuarios, grupo, rol):
+    from .models import Notificacion
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        creadas = Notificacion.objects.bulk_create([
+            Notificacion(usuario_id=usuario_id, tipo=tipo, mensaje=mensaje, fechaEnvio=ahora)
+            for usuario_id in resolver_destinatarios(usuarios, grupo, rol)
+        ])
+        ajustar_contadores(deltas_de(creadas))
+    return len(creadas)
+
+
+def notificar(mensaje, tipo='general', usuarios=None, grupo=None, rol=None, diferir=False):
+    """
+    Crea la misma notificación para cada destinatario.
+
+    Devuelve la cantidad de notificaciones creadas, o None si se difirió hasta
+    confirmar la transacción en curso (fuera de una transacción se crean de
+    inmediato). Un error al crearlas se propaga a la petición, no se descarta.
+    """
+    if not diferir:
+        return _crear_notificaciones(mensaje, tipo, usuarios, grupo, rol)
+
+    if usuarios is not None:
+        usuarios = resolver_destinatarios(usuarios)
+    transaction.on_commit(lambda: _crear_notificaciones(mensaje, tipo, usuarios, grupo, rol))
+    return None
+
+
+def ultimo_id_notificacion(usuario):
+    """Mayor id de notificación del usuario (0 si no tiene): una búsqueda en el índice de usuario"""
+    from .models import Notificacion
+
+    return Notificacion.objects.filter(usuario=usuario).aggregate(
+        ultimo=Max('idNotificacion'))['ultimo'] or 0
+
+
+def notificaciones_desde(usuario, cursor, limite=50):
+    """
+    Notificaciones del usuario con id mayor que ``cursor``, de la más antigua a la más nueva.
+
+    Primero se compara el mayor id con el cursor, que es lo único que cuesta
+    la consulta cuando no hay nada nuevo (el caso habitual al sondear).
+    """
+    from .models import Notificacion
+
+    if ultimo_id_notificacion(usuario) <= cursor:
+        return []
+    return list(Notificacion.objects.filter(usuario=usuario, idNotificacion__gt=cursor).order_by(
+        'idNotificacion')[:limite])
+
+
+def paginar_notificaciones(notificaciones, despues=None, antes=None, tamaño=TAMAÑO_PAGINA_NOTIFICACIONES):
+    """
+    Página de notificaciones, de la más reciente a la más antigua, por clave
+    (fechaEnvio, idNotificacion) con ``paginar_por_clave``. Devuelve
+    ``{'notificaciones': [...], 'anterior': cursor o None, 'siguiente': cursor o None}``.
+    """
+    filas, anterior, siguiente = paginar_por_clave(notificaciones, 'fechaEnvio', despues, antes, tamaño)
+    return {'notificaciones': filas, 'anterior': anterior, 'siguiente': siguiente}
@@ -0,0 +1,251 @@
+"""
+Ocupación cabaña × día.
+
+Las reservas y mantenimientos se agrupan por cabaña y se "pintan" sobre el
+arreglo de días de cada cabaña. El resultado se materializa en la tabla
+``OcupacionDia`` (solo los días ocupados), que las señales de
+``gestion.signals`` mantienen al día repintando únicamente la ventana de fechas
+afectada por cada cambio. El calendario y los indicadores de ocupación leen de
+esa tabla con consultas por rango indexadas.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .disponibilidad import ESTADOS_RESERVA_BLOQUEANTES, ESTADOS_MANTENIMIENTO_BLOQUEANTES
+
+DISPONIBLE = 'disponible'
+RESERVADA = 'reservada'
+MANTENIMIENTO = 'mantenimiento'
+
+
+def pintar_dias(fecha_inicio, num_dias, reservas, mantenimientos):
+    """
+    Estados y reservas día a día de una cabaña a partir de fecha_inicio.
+
+    Un día reservado tiene prioridad sobre el mantenimiento. Si dos reservas se
+    solapan se conserva la confirmada (``OcupacionDia`` guarda una sola reserva
+    por día); entre reservas del mismo estado, la primera de la lista, igual que
+    el calendario original.
+    """
+    estados = [DISPONIBLE] * num_dias
+    reservas_dia = [None] * num_dias
+    base = fecha_inicio.toordinal()
+
+    for mantenimiento in mantenimientos:
+        posicion = mantenimiento.fechaProgramada.toordinal() - base
+        if 0 <= posicion < num_dias:
+            estados[posicion] = MANTENIMIENTO
+
+    for reserva in sorted(reservas, key=lambda reserva: reserva.estado != 'confirmada'):
+        desde = max(reserva.fechaInicio.toordinal() - base, 0)
+        hasta = min(reserva.fechaFin.toordinal() - base, num_dias - 1)
+        for posicion in range(desde, hasta + 1):
+            if reservas_dia[posicion] is None:
+                estados[posicion] = RESERVADA
+                reservas_dia[posicion] = reserva
+
+    return estados, reservas_dia
+
+
+def _filas_ocupacion(cabaña_id, fecha_inicio, estados, reservas_dia):
+    """Convierte los arreglos pintados en filas de OcupacionDia (solo días ocupados)"""
+    from .models import OcupacionDia
+
+    base = fecha_inicio.toordinal()
+    return [
+        OcupacionDia(
+            cabaña_id=cabaña_id,
+            fecha=date.fromordinal(base + posicion),
+            estado=estado,
+            reserva=reservas_dia[posicion],
+        )
+        for posicion, estado in enumerate(estados)
+        if estado != DISPONIBLE
+    ]
+
+
+def actualizar_ocupacion(cabaña_id, fecha_inicio, fecha_fin):
+    """Repinta la ocupación materializada de una cabaña en [fecha_inicio, fecha_fin]"""
+    from .models import Reserva, Mantenimiento, OcupacionDia
+
+    if cabaña_id is None or fecha_inicio is None or fecha_fin is None:
+        return
+    if fecha_fin < fecha_inicio:
+        fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+
+    reservas = Reserva.objects.filter(
+        cabaña_id=cabaña_id,
+        fechaInicio__lte=fecha_fin,
+        fechaFin__gte=fecha_inicio,
+        estado__in=ESTADOS_RESERVA_BLOQUEANTES,
+    ).only('idReserva', 'cabaña_id', 'fechaInicio', 'fechaFin', 'estado')
+    mantenimientos = Mantenimiento.objects.filter(
+        cabaña_id=cabaña_id,
+        fechaProgramada__range=(fecha_inicio, fecha_fin),
+        estado__in=ESTADOS_MANTENIMIENTO_BLOQUEANTES,
+    ).only('fechaProgramada')
+
+    estados, reservas_dia = pintar_dias(
+        fecha_inicio, (fecha_fin - fecha_inicio).days + 1, reservas, mantenimientos
+    )
+
+    with transaction.atomic():
+        OcupacionDia.objects.filter(cabaña_id=cabaña_id, fecha__range=(fecha_inicio, fecha_fin)).delete()
+        OcupacionDia.objects.bulk_create(_filas_ocupacion(cabaña_id, fecha_inicio, estados, reservas_dia))
+
+
+def reconstruir_ocupacion(cabaña_ids=None):
+    """Reconstruye desde cero la ocupación materializada (todas las cabañas o las indicadas)"""
+    from .models import Cabaña, Reserva, Mantenimiento, OcupacionDia
+
+    if cabaña_ids is None:
+        cabaña_ids = list(Cabaña.objects.values_list('pk', flat=True))
+
+    reservas_por_cabaña = defaultdict(list)
+    for reserva in Reserva.objects.filter(
+        cabaña_id__in=cabaña_ids,
+        estado__in=ESTADOS_RESERVA_BLOQUEANTES,
+    ).only('idReserva', 'cabaña_id', 'fechaInicio', 'fechaFin', 'estado'):
+        reservas_por_cabaña[reserva.cabaña_id].append(reserva)
+
+    mantenimientos_por_cabaña = defaultdict(list)
+    for mantenimiento in Mantenimiento.objects.filter(
+        cabaña_id__in=cabaña_ids,
+        estado__in=ESTADOS_MANTENIMIENTO_BLOQUEANTES,
+    ).only('cabaña_id', 'fechaProgramada'):
+        mantenimientos_por_cabaña[mantenimiento.cabaña_id].append(mantenimiento)
+
+    filas = []
+    for cabaña_id in cabaña_ids:
+        reservas = reservas_por_cabaña.get(cabaña_id, [])
+        mantenimientos = mantenimientos_por_cabaña.get(cabaña_id, [])
+        fechas = [r.fechaInicio for r in reservas] + [m.fechaProgramada for m in mantenimientos]
+        if not fechas:
+            continue
+        fecha_inicio = min(fechas)
+        fecha_fin = max([r.fechaFin for r in reservas] + [m.fechaProgramada for m in mantenimientos])
+        estados, reservas_dia = pintar_dias(
+            fecha_inicio, (fecha_fin - fecha_inicio).days + 1, reservas, mantenimientos
+        )
+        filas.extend(_filas_ocupacion(cabaña_id, fecha_inicio, estados, reservas_dia))
+
+    with transaction.atomic():
+        OcupacionDia.objects.filter(cabaña_id__in=cabaña_ids).delete()
+        OcupacionDia.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def construir_matriz_ocupacion(cabañas, fecha_inicio, fecha_fin):
+    """
+    Filas del calendario para las cabañas entre fecha_inicio y fecha_fin (inclusive).
+
+    Cada fila es ``{'cabaña': cabaña, 'dias': [(estado, reserva), ...]}`` con un
+    elemento por día, listo para recorrer en la plantilla. Se lee de la tabla
+    materializada con una consulta por rango, más otra para las reservas del rango.
+    """
+    from .models import Reserva, OcupacionDia
+
+    num_dias = (fecha_fin - fecha_inicio).days + 1
+    base = fecha_inicio.toordinal()
+
+    reservas = Reserva.objects.filter(
+        fechaInicio__lte=fecha_fin,
+        fechaFin__gte=fecha_inicio,
+        estado__in=ESTADOS_RESERVA_BLOQUEANTES,
+    ).select_related('cliente').in_bulk()
+
+    dias_por_cabaña = {}
+    for cabaña_id, fecha, estado, reserva_id in OcupacionDia.objects.filter(
+        fecha__range=(fecha_inicio, fecha_fin),
+    ).values_list('cabaña_id', 'fecha', 'estado', 'reserva_id'):
+        if cabaña_id not in dias_por_cabaña:
+            dias_por_cabaña[cabaña_id] = ([DISPONIBLE] * num_dias, [None] * num_dias)
+        estados, reservas_dia = dias_por_cabaña[cabaña_id]
+        posicion = fecha.toordinal() - base
+        estados[posicion] = estado
+        reservas_dia[posicion] = reservas.get(reserva_id)
+
+    vacia = [(DISPONIBLE, None)] * num_dias
+    filas = []
+    for cabaña in cabañas:
+        if cabaña.pk in dias_por_cabaña:
+            dias = list(zip(*dias_por_cabaña[cabaña.pk]))
+        else:
+            dias = vacia
+        filas.append({'cabaña': cabaña, 'dias': dias})
+    return filas
+
+
+CODIGOS_ESTADO = {DISPONIBLE: 'd', RESERVADA: 'r', MANTENIMIENTO: 'm'}
+
+
+def codificar_matriz(filas, fecha_inicio, fecha_fin):
+    """
+    Representación compacta (serializable a JSON) de la matriz de ocupación.
+
+    Cada cabaña lleva sus estados como una cadena con un carácter por día
+    (ver ``CODIGOS_ESTADO``) y sus reservas como tramos ``[id, día_desde, día_hasta]``
+    con índices relativos a fecha_inicio.
+    """
+    clientes = {}
+    cabañas = []
+    for fila in filas:
+        estados = []
+        tramos = []
+        for posicion, (estado, reserva) in enumerate(fila['dias']):
+            estados.append(CODIGOS_ESTADO[estado])
+            if reserva is None:
+                continue
+            if tramos and tramos[-1][0] == reserva.pk and tramos[-1][2] == posicion - 1:
+                tramos[-1][2] = posicion
+            else:
+                tramos.append([reserva.pk, posicion, posicion])
+                clientes[reserva.pk] = reserva.cliente.nombre
+        cabañas.append({
+            'id': fila['cabaña'].pk,
+            'nombre': fila['cabaña'].nombre,
+            'estados': ''.join(estados),
+            'reservas': tramos,
+        })
+
+    return {
+        'desde': fecha_inicio.isoformat(),
+        'hasta': fecha_fin.isoformat(),
+        'dias': (fecha_fin - fecha_inicio).days + 1,
+        'codigos': {codigo: estado for estado, codigo in CODIGOS_ESTADO.items()},
+        'cabañas': cabañas,
+        'clientes': clientes,
+    }
+
+
+def version_ocupacion(fecha_inicio, fecha_fin):
+    """
+    Huella de los datos del calendario en el rango, útil como ETag.
+
+    Cada cambio de ocupación repinta su ventana borrando e insertando filas, por
+    lo que la cantidad y el mayor id de las filas del rango cambian con él. Los
+    nombres de cabañas y clientes, y el cliente de cada reserva, no cambian la
+    ocupación: se cubren con la última modificación (``modificado``) de las
+    cabañas y de las reservas del rango y sus clientes.
+    """
+    from .models import Cabaña, Mantenimiento, OcupacionDia, Reserva
+
+    ocupacion = OcupacionDia.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).aggregate(
+        filas=Count('idOcupacion'), ultima=Max('idOcupacion'))
+    cabañas = Cabaña.objects.aggregate(
+        total=Count('idCabaña'), ultima=Max('idCabaña'), modificada=Max('modificado'))
+    reservas = Reserva.objects.filter(fechaInicio__lte=fecha_fin, fechaFin__gte=fecha_inicio).aggregate(
+        reserva=Max('modificado'), cliente=Max('cliente__modificado'))
+    mantenimientos = Mantenimiento.objects.filter(fechaProgramada__range=(fecha_inicio, fecha_fin)).aggregate(
+        modificado=Max('modificado'))
+
+    modificaciones = [
+        cabañas['modificada'], reservas['reserva'], reservas['cliente'], mantenimientos['modificado'],
+    ]
+    marcas = '.'.join(f'{marca.timestamp():.6f}' if marca else '0' for marca in modificaciones)
+    return (f"{fecha_inicio:%Y%m%d}-{fecha_fin:%Y%m%d}-"
+            f"{ocupacion['filas']}.{ocupacion['ultima'] or 0}-{cabañas['total']}.{cabañas['ultima'] or 0}-"
+            f"{marcas}")
@@ -0,0 +1,102 @@
+"""
+Paginación por clave (keyset) de la más reciente a la más antigua.
+
+Los registros se ordenan por (campo de fecha, clave primaria) descendente y cada
+página se pide como "las N anteriores/posteriores a este registro", así que la
+página N cuesta lo mismo que la primera. Las condiciones se escriben como
+``fecha <= f AND (fecha < f OR pk < i)`` para que la base de datos busque la
+posición en un índice sobre (fecha, pk) en vez de recorrer desde el principio.
+
+Si el campo admite NULL, esos registros van al final (como los más antiguos),
+ordenados por clave primaria; se leen con una consulta aparte que también usa
+el índice (fecha IS NULL, pk).
+"""
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def codificar_cursor(registro, campo):
+    """Cursor del registro: fecha ISO (vacía si es NULL) y clave primaria"""
+    fecha = getattr(registro, campo)
+    return f'{fecha.isoformat() if fecha is not None else ""}_{registro.pk}'
+
+
+def decodificar_cursor(cursor):
+    """(fecha o None, clave primaria) del cursor, o None si no es válido"""
+    try:
+        fecha, pk = cursor.rsplit('_', 1)
+        return (datetime.fromisoformat(fecha) if fecha else None), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _admite_nulos(registros, campo):
+    return registros.model._meta.get_field(campo).null
+
+
+def _mas_antiguos(registros, campo, cursor, limite):
+    """Hasta ``limite`` registros posteriores al cursor en orden descendente (sin cursor, desde el inicio)"""
+    filas = []
+    if cursor is None or cursor[0] is not None:
+        con_fecha = registros.filter(**{f'{campo}__isnull': False})
+        if cursor is not None:
+            fecha, pk = cursor
+            con_fecha = con_fecha.filter(
+                Q(**{f'{campo}__lte': fecha}),
+                Q(**{f'{campo}__lt': fecha}) | Q(pk__lt=pk),
+            )
+        filas = list(con_fecha.order_by(f'-{campo}', '-pk')[:limite])
+
+    if len(filas) < limite and _admite_nulos(registros, campo):
+        sin_fecha = registros.filter(**{f'{campo}__isnull': True})
+        if cursor is not None and cursor[0] is None:
+            sin_fecha = sin_fecha.filter(pk__lt=cursor[1])
+        filas += list(sin_fecha.order_by('-pk')[:limite - len(filas)])
+    return filas
+
+
+def _mas_recientes(registros, campo, cursor, limite):
+    """Hasta ``limite`` registros anteriores al cursor, del más cercano al más lejano"""
+    fecha, pk = cursor
+    filas = []
+    if fecha is None:
+        filas = list(registros.filter(**{f'{campo}__isnull': True}, pk__gt=pk).order_by('pk')[:limite])
+        if len(filas) < limite:
+            filas += list(registros.filter(**{f'{campo}__isnull': False}).order_by(
+                campo, 'pk')[:limite - len(filas)])
+        return filas
+
+    return list(registros.filter(
+        Q(**{f'{campo}__gte': fecha}),
+        Q(**{f'{campo}__gt': fecha}) | Q(pk__gt=pk),
+    ).order_by(campo, 'pk')[:limite])
+
+
+def paginar_por_clave(registros, campo, despues=None, antes=None, tamaño=50):
+    """
+    Página de ``registros`` por (``campo``, pk) descendente.
+
+    ``despues`` pide los que siguen (más antiguos) a ese cursor y ``antes`` los
+    que lo preceden (más recientes); sin cursor, la primera página. Devuelve
+    ``(filas, cursor anterior o None, cursor siguiente o None)``.
+    """
+    despues = decodificar_cursor(despues)
+    antes = decodificar_cursor(antes)
+
+    if antes:
+        filas = _mas_recientes(registros, campo, antes, tamaño + 1)
+        hay_mas_recientes = len(filas) > tamaño
+        filas = filas[:tamaño][::-1]
+        hay_mas_antiguos = True
+    else:
+        filas = _mas_antiguos(registros, campo, despues, tamaño + 1)
+        hay_mas_antiguos = len(filas) > tamaño
+        filas = filas[:tamaño]
+        hay_mas_recientes = despues is not None
+
+    return (
+        filas,
+        codificar_cursor(filas[0], campo) if filas and hay_mas_recientes else None,
+        codificar_cursor(filas[-1], campo) if filas and hay_mas_antiguos else None,
+    )
@@ -0,0 +1,189 @@
+"""
+Preparación de cabañas.
+
+Al iniciar la preparación de una reserva se crea su ``PreparacionCabaña`` y una
+fila ``ItemPreparacionCompletado`` por cada tarea del catálogo, todo en una
+transacción y con un solo ``bulk_create``. Si dos peticiones inician la misma
+preparación a la vez, el OneToOne de la reserva y el unique_together
+(preparacion, tarea) impiden duplicados.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .catalogos import cache_tareas, catalogo_tareas
+
+
+def instanciar_tareas(preparacion, tareas=None):
+    """
+    Crea las filas de tareas que falten en la preparación (todas las del catálogo
+    si no se indican). Devuelve la cantidad de filas intentadas.
+    """
+    from .models import ItemPreparacionCompletado
+
+    if tareas is None:
+        tareas = catalogo_tareas().tareas
+    items = [
+        ItemPreparacionCompletado(preparacion=preparacion, tarea_id=getattr(tarea, 'pk', tarea), completado=False)
+        for tarea in tareas
+    ]
+    ItemPreparacionCompletado.objects.bulk_create(items, batch_size=500, ignore_conflicts=True)
+    return len(items)
+
+
+def iniciar_preparacion(reserva, **defaults):
+    """
+    Obtiene o crea la preparación de la reserva; si se crea, instancia sus tareas.
+    ``defaults`` son los valores iniciales de la preparación (encargado, estado).
+    Devuelve (preparacion, creada).
+    """
+    from .models import PreparacionCabaña
+
+    with transaction.atomic():
+        preparacion, creada = PreparacionCabaña.objects.get_or_create(reserva=reserva, defaults=defaults)
+        if creada:
+            instanciar_tareas(preparacion)
+    return preparacion, creada
+
+
+def items_de_preparacion(preparacion):
+    """
+    Items de la preparación en el orden del catálogo, con su tarea tomada del
+    catálogo en memoria (sin join). Las tareas que no estén en el catálogo (por
+    ejemplo, creadas en otro proceso hace menos de ``VIGENCIA_CATALOGOS``
+    segundos) se leen de la base de datos con una consulta y el catálogo se
+    descarta para que la próxima lectura las incluya.
+    """
+    from .models import ItemPreparacionCompletado, TareaPreparacion
+
+    items = list(ItemPreparacionCompletado.objects.filter(preparacion=preparacion).order_by())
+    tareas = catalogo_tareas().por_id
+    faltantes = {item.tarea_id for item in items} - tareas.keys()
+    if faltantes:
+        tareas = {**tareas, **TareaPreparacion.objects.in_bulk(faltantes)}
+        cache_tareas.invalidar(None)
+        # Una tarea eliminada entre ambas lecturas se llevó sus items en cascada
+        items = [item for item in items if item.tarea_id in tareas]
+
+    for item in items:
+        item.tarea = tareas[item.tarea_id]
+    # El mismo orden que el catálogo: categoría, orden y nombre
+    items.sort(key=lambda item: (item.tarea.categoria, item.tarea.orden, item.tarea.nombre, item.tarea_id))
+    return items
+
+
+def porcentaje_de(items):
+    """Porcentaje de tareas completadas calculado sobre los items ya cargados"""
+    from .models import calcular_porcentaje
+
+    items = list(items)
+    return calcular_porcentaje(sum(1 for item in items if item.completado), len(items))
+
+
+def cambios_tareas(items, completadas, ahora=None):
+    """
+    Marca en memoria las tareas según los ids enviados en el formulario y
+    devuelve solo los items que cambiaron.
+    """
+    ahora = ahora or timezone.now()
+    completadas = {str(tarea_id) for tarea_id in completadas}
+    cambiados = []
+    for item in items:
+        completado = str(item.tarea_id) in completadas
+        if completado == item.completado:
+            continue
+        item.completado = completado
+        item.fecha_completado = ahora if completado else None
+        cambiados.append(item)
+    return cambiados
+
+
+def cambios_inventario(items_verificacion, datos):
+    """
+    Aplica en memoria los campos de inventario del formulario de preparación y
+    devuelve solo las verificaciones que cambiaron.
+    """
+    cambiados = []
+    for item_ver in items_verificacion:
+        item_id = item_ver.item_id
+        esperado = item_ver.cantidad_esperada
+        try:
+            cantidad = int(datos.get(f'inventario_cantidad_{item_id}', esperado))
+        except (ValueError, TypeError):
+            cantidad = esperado
+
+        # El checkbox marcado fuerza 'bueno'; si no, vale el estado del select
+        if datos.get(f'inventario_verificado_{item_id}') == 'on':
+            estado = 'bueno'
+        else:
+            estado = datos.get(f'inventario_estado_{item_id}', 'regular') or 'regular'
+
+        observaciones = datos.get(f'inventario_obs_{item_id}', '') or item_ver.observaciones
+
+        if (cantidad, estado, observaciones) == (
+                item_ver.cantidad_entregada, item_ver.estado_entregado, item_ver.observaciones):
+            continue
+        item_ver.cantidad_entregada = cantidad
+        item_ver.estado_entregado = estado
+        item_ver.observaciones = observaciones
+        cambiados.append(item_ver)
+    return cambiados
+
+
+def guardar_progreso(items, items_verificacion, datos):
+    """
+    Persiste el formulario de preparación: un ``bulk_update`` por modelo con solo
+    las filas que cambiaron, en una transacción. Devuelve el nuevo porcentaje de
+    avance calculado en memoria.
+    """
+    from .models import ItemPreparacionCompletado, ItemVerificacion
+
+    items = list(items)
+    tareas = cambios_tareas(items, datos.getlist('tareas_completadas'))
+    inventario = cambios_inventario(items_verificacion, datos)
+
+    with transaction.atomic():
+        if tareas:
+            ItemPreparacionCompletado.objects.bulk_update(tareas, ['completado', 'fecha_completado'])
+        if inventario:
+            ItemVerificacion.objects.bulk_update(
+                inventario, ['cantidad_entregada', 'estado_entregado', 'observaciones'])
+    return porcentaje_de(items)
+
+
+def porcentaje_preparacion(preparacion_id):
+    """Porcentaje de avance de una preparación con un solo conteo condicional"""
+    from .models import ItemPreparacionCompletado, calcular_porcentaje
+
+    conteos = ItemPreparacionCompletado.objects.filter(preparacion_id=preparacion_id).aggregate(
+        total=Count('pk'), completadas=Count('pk', filter=Q(completado=True)))
+    return calcular_porcentaje(conteos['completadas'], conteos['total'])
+
+
+def marcar_tarea(item, completado, ahora=None):
+    """Marca o desmarca una tarea escribiendo solo su fila (nada si no cambia)"""
+    from .models import ItemPreparacionCompletado
+
+    if item.completado == completado:
+        return False
+    item.completado = completado
+    item.fecha_completado = (ahora or timezone.now()) if completado else None
+    ItemPreparacionCompletado.objects.filter(pk=item.pk).update(
+        completado=item.completado, fecha_completado=item.fecha_completado)
+    return True
+
+
+def actualizar_verificacion(item_ver, **campos):
+    """
+    Actualiza los campos indicados de una verificación de inventario escribiendo
+    solo su fila (nada si no cambia ninguno).
+    """
+    from .models import ItemVerificacion
+
+    cambios = {campo: valor for campo, valor in campos.items() if getattr(item_ver, campo) != valor}
+    if not cambios:
+        return False
+    for campo, valor in cambios.items():
+        setattr(item_ver, campo, valor)
+    ItemVerificacion.objects.filter(pk=item_ver.pk).update(**cambios)
+    return True
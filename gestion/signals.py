@@ -0,0 +1,143 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalogos import cache_tareas, cache_checklists
+from .disponibilidad import indice_ocupacion
+from .models import (
+    Cabaña, Reserva, Mantenimiento, ReglaTarifa, Notificacion, TareaPreparacion, ChecklistInventario,
+)
+from .notificaciones import ajustar_contadores
+from .ocupacion import actualizar_ocupacion
+from .tarifas import motor_tarifas
+
+
+def _borrado_en_cascada(modelo, origin=None, **kwargs):
+    """Indica si la señal proviene de eliminar una instancia (o queryset) del modelo indicado"""
+    if isinstance(origin, QuerySet):
+        return origin.model is modelo
+    return isinstance(origin, modelo)
+
+
+def _borrado_en_cascada_de_cabaña(**kwargs):
+    """Indica si la señal proviene de eliminar la cabaña completa (su ocupación se borra con ella)"""
+    return _borrado_en_cascada(Cabaña, **kwargs)
+
+
+def _invalidar(cache, *claves):
+    """Descarta las entradas del cache ahora y de nuevo al confirmar la transacción en curso"""
+    cache.invalidar(*claves)
+    transaction.on_commit(lambda: cache.invalidar(*claves))
+
+
+def _repintar_ventanas(anterior, actual):
+    """Repinta la ocupación de la ventana anterior y la actual, fusionándolas si es la misma cabaña"""
+    cabaña_anterior, inicio_anterior, fin_anterior = anterior
+    cabaña_actual, inicio_actual, fin_actual = actual
+
+    if cabaña_anterior == cabaña_actual and inicio_anterior and fin_anterior:
+        actualizar_ocupacion(cabaña_actual, min(inicio_anterior, inicio_actual), max(fin_anterior, fin_actual))
+        return
+
+    actualizar_ocupacion(cabaña_anterior, inicio_anterior, fin_anterior)
+    actualizar_ocupacion(cabaña_actual, inicio_actual, fin_actual)
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+def sincronizar_reserva(sender, instance, **kwargs):
+    """Mantiene la ocupación materializada de la reserva y el índice de disponibilidad"""
+    anterior = (
+        instance.valor_original('cabaña_id'),
+        instance.valor_original('fechaInicio'),
+        instance.valor_original('fechaFin'),
+    )
+    actual = (instance.cabaña_id, instance.fechaInicio, instance.fechaFin)
+
+    if _borrado_en_cascada_de_cabaña(**kwargs):
+        return
+
+    # Altas y bajas siempre repintan; las modificaciones solo si cambian cabaña, fechas o estado
+    if kwargs.get('created', True) or anterior != actual or instance.valor_original('estado') != instance.estado:
+        _repintar_ventanas(anterior, actual)
+        _invalidar(indice_ocupacion, *{anterior[0], actual[0]} - {None})
+
+    instance.registrar_valores_actuales()
+
+
+@receiver(post_save, sender=Mantenimiento)
+@receiver(post_delete, sender=Mantenimiento)
+def sincronizar_mantenimiento(sender, instance, **kwargs):
+    """Mantiene la ocupación materializada del mantenimiento y el índice de disponibilidad"""
+    cabaña_anterior = instance.valor_original('cabaña_id')
+    fecha_anterior = instance.valor_original('fechaProgramada')
+
+    if _borrado_en_cascada_de_cabaña(**kwargs):
+        return
+
+    if (cabaña_anterior, fecha_anterior) != (instance.cabaña_id, instance.fechaProgramada):
+        actualizar_ocupacion(cabaña_anterior, fecha_anterior, fecha_anterior)
+    actualizar_ocupacion(instance.cabaña_id, instance.fechaProgramada, instance.fechaProgramada)
+    _invalidar(indice_ocupacion, *{cabaña_anterior, instance.cabaña_id} - {None})
+
+    instance.registrar_valores_actuales()
+
+
+@receiver(post_save, sender=ReglaTarifa)
+@receiver(post_delete, sender=ReglaTarifa)
+def sincronizar_regla_tarifa(sender, instance, **kwargs):
+    """Las tablas de precios de la cabaña dependen de sus reglas"""
+    _invalidar(motor_tarifas, instance.cabaña_id)
+
+
+@receiver(post_save, sender=Cabaña)
+@receiver(post_delete, sender=Cabaña)
+def sincronizar_precio_cabaña(sender, instance, **kwargs):
+    """Las tablas de precios parten del precio base de la cabaña"""
+    _invalidar(motor_tarifas, instance.pk)
+
+
+@receiver(post_save, sender=TareaPreparacion)
+@receiver(post_delete, sender=TareaPreparacion)
+def sincronizar_catalogo_tareas(sender, instance, **kwargs):
+    """El catálogo de tareas se guarda completo: cualquier cambio lo descarta"""
+    _invalidar(cache_tareas, None)
+
+
+@receiver(post_save, sender=ChecklistInventario)
+@receiver(post_delete, sender=ChecklistInventario)
+def sincronizar_checklist_cabaña(sender, instance, **kwargs):
+    """Descarta el checklist de la cabaña del item (y el de la anterior si se movió)"""
+    cabañas = {instance.cabaña_id, instance.valor_original('cabaña_id')}
+    cabañas.discard(None)
+    _invalidar(cache_checklists, *cabañas)
+    instance.registrar_valores_actuales()
+
+
+@receiver(post_save, sender=Notificacion)
+@receiver(post_delete, sender=Notificacion)
+def sincronizar_contador_notificaciones(sender, instance, **kwargs):
+    """Ajusta los contadores del usuario al crear, marcar como leída/no leída o eliminar una notificación"""
+    # Al eliminar el usuario su contador se elimina con él
+    if _borrado_en_cascada(User, **kwargs):
+        return
+
+    deltas = {}
+
+    def sumar(usuario_id, total, no_leidas):
+        anterior = deltas.get(usuario_id, (0, 0))
+        deltas[usuario_id] = (anterior[0] + total, anterior[1] + no_leidas)
+
+    if not kwargs.get('created', False):
+        # Se descuenta la notificación tal como se leyó de la base de datos
+        originales = getattr(instance, '_valores_originales', {})
+        sumar(originales.get('usuario_id', instance.usuario_id), -1,
+              0 if originales.get('leida', instance.leida) else -1)
+    if 'created' in kwargs:
+        # post_save: se suma tal como quedó guardada
+        sumar(instance.usuario_id, 1, 0 if instance.leida else 1)
+
+    ajustar_contadores(deltas)
+    instance.registrar_valores_actuales()
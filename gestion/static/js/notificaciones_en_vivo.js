@@ -0,0 +1,101 @@
+/*
+ * Notificaciones en vivo: consulta cada tanto las notificaciones nuevas del
+ * usuario (por cursor de id), actualiza la insignia del menú y avisa en la
+ * página cuando llegan. Cada consulta responde de inmediato; no se consulta
+ * mientras la pestaña está oculta y, ante errores, se espera cada vez más.
+ * Uso: <script src=".../notificaciones_en_vivo.js" data-url="{% url 'notificaciones_nuevas' %}"
+ *              data-panel="{% url 'notificaciones_encargado' %}"></script>
+ */
+(function() {
+    var script = document.currentScript;
+    if (!script || !window.fetch) {
+        return;
+    }
+    var url = script.getAttribute('data-url');
+    var urlPanel = script.getAttribute('data-panel');
+    var INTERVALO = 20000;
+    var INTERVALO_MAXIMO = 300000;
+    var espera = INTERVALO;
+    var cursor = null;
+    var temporizador = null;
+    var nuevas = 0;
+    var aviso = null;
+
+    function actualizarInsignia(noLeidas) {
+        document.querySelectorAll('.nav-notificaciones').forEach(function(enlace) {
+            var insignia = enlace.querySelector('.nav-badge');
+            if (!noLeidas) {
+                if (insignia) {
+                    insignia.remove();
+                }
+                return;
+            }
+            if (!insignia) {
+                insignia = document.createElement('span');
+                insignia.className = 'nav-badge';
+                enlace.appendChild(document.createTextNode(' '));
+                enlace.appendChild(insignia);
+            }
+            insignia.textContent = noLeidas;
+        });
+    }
+
+    function mostrarAviso(notificacion) {
+        nuevas += 1;
+        if (!aviso) {
+            aviso = document.createElement('div');
+            aviso.className = 'alert alert-info';
+            var contenido = document.querySelector('.content');
+            contenido.insertBefore(aviso, contenido.firstChild);
+        }
+        aviso.textContent = '';
+        var texto = document.createElement('span');
+        texto.textContent = nuevas === 1
+            ? 'Nueva notificación (' + notificacion.tipo_display + '): ' + notificacion.mensaje + ' '
+            : nuevas + ' notificaciones nuevas. ';
+        aviso.appendChild(texto);
+        var enlace = document.createElement('a');
+        enlace.href = urlPanel || window.location.href;
+        enlace.textContent = 'Ver notificaciones';
+        aviso.appendChild(enlace);
+    }
+
+    function programar() {
+        clearTimeout(temporizador);
+        temporizador = setTimeout(consultar, espera);
+    }
+
+    function consultar() {
+        if (document.hidden) {
+            return;
+        }
+        var consulta = cursor === null ? url : url + '?desde=' + cursor;
+        fetch(consulta, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+            .then(function(respuesta) {
+                if (!respuesta.ok) {
+                    throw new Error(respuesta.status);
+                }
+                return respuesta.json();
+            })
+            .then(function(datos) {
+                cursor = datos.cursor;
+                datos.notificaciones.forEach(mostrarAviso);
+                if (datos.notificaciones.length) {
+                    actualizarInsignia(datos.no_leidas);
+                }
+                espera = INTERVALO;
+            })
+            .catch(function() {
+                espera = Math.min(espera * 2, INTERVALO_MAXIMO);
+            })
+            .then(programar);
+    }
+
+    document.addEventListener('visibilitychange', function() {
+        if (!document.hidden) {
+            clearTimeout(temporizador);
+            consultar();
+        }
+    });
+    consultar();
+})();
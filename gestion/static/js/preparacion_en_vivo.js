@@ -0,0 +1,98 @@
+/*
+ * Guardado inmediato en la preparación de cabaña: cada tarea marcada y cada
+ * cambio de una fila de inventario se envía por PATCH y escribe solo esa fila.
+ * Sin JavaScript (o si el envío falla) el formulario sigue funcionando igual:
+ * "Guardar Progreso" persiste el estado completo de la página.
+ * Uso: <script src=".../preparacion_en_vivo.js" data-form="id-del-formulario"></script>
+ */
+(function() {
+    var script = document.currentScript;
+    if (!script || !window.fetch) {
+        return;
+    }
+    var formulario = document.getElementById(script.getAttribute('data-form'));
+    if (!formulario) {
+        return;
+    }
+    var token = formulario.querySelector('input[name="csrfmiddlewaretoken"]').value;
+    var porcentaje = document.getElementById('porcentaje-completado');
+
+    function enviar(url, datos) {
+        return fetch(url, {
+            method: 'PATCH',
+            credentials: 'same-origin',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': token,
+                'X-Requested-With': 'XMLHttpRequest'
+            },
+            body: JSON.stringify(datos)
+        }).then(function(respuesta) {
+            if (!respuesta.ok) {
+                throw new Error(respuesta.status);
+            }
+            return respuesta.json();
+        }).then(function(resultado) {
+            if (porcentaje) {
+                porcentaje.textContent = resultado.porcentaje_completado;
+            }
+            return resultado;
+        });
+    }
+
+    function marcarFila(fila, completa) {
+        fila.classList.toggle('item-completado', completa);
+        fila.classList.toggle('item-pendiente', !completa);
+    }
+
+    function actualizarTarea(casilla) {
+        var fila = casilla.closest('tr');
+        enviar(casilla.getAttribute('data-url'), {completado: casilla.checked}).then(function(tarea) {
+            marcarFila(fila, tarea.completado);
+            fila.querySelector('.estado-tarea').innerHTML = tarea.completado
+                ? '<span class="badge badge-success">✓ Completado</span>'
+                : '<span class="badge badge-secondary">Pendiente</span>';
+            var fecha = document.createElement('small');
+            if (tarea.completado) {
+                fecha.textContent = tarea.fecha_completado;
+            } else {
+                fecha.className = 'text-muted';
+                fecha.textContent = '-';
+            }
+            var celda = fila.querySelector('.fecha-tarea');
+            celda.textContent = '';
+            celda.appendChild(fecha);
+        }).catch(function() {
+            // Queda pendiente de "Guardar Progreso"
+        });
+    }
+
+    function actualizarInventario(fila) {
+        var cantidad = parseInt(fila.querySelector('input[type="number"]').value, 10);
+        var verificado = fila.querySelector('input[type="checkbox"]').checked;
+        var datos = {
+            estado: verificado ? 'bueno' : fila.querySelector('select').value,
+            observaciones: fila.querySelector('input[type="text"]').value
+        };
+        if (cantidad >= 0) {
+            datos.cantidad = cantidad;
+        }
+        enviar(fila.getAttribute('data-url'), datos).then(function(item) {
+            marcarFila(fila, item.estado === 'bueno');
+        }).catch(function() {
+            // Queda pendiente de "Guardar Progreso"
+        });
+    }
+
+    formulario.addEventListener('change', function(evento) {
+        var elemento = evento.target;
+        if (elemento.name === 'tareas_completadas' && elemento.hasAttribute('data-url')) {
+            actualizarTarea(elemento);
+            return;
+        }
+        var fila = elemento.closest('tr[data-url]');
+        if (fila) {
+            actualizarInventario(fila);
+        }
+    });
+})();
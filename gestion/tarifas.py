@@ -0,0 +1,162 @@
+"""
+Motor de tarifas por cabaña.
+
+Para cada cabaña se precalcula, a partir de su precio base y sus ``ReglaTarifa``,
+el precio de cada noche del horizonte de reservas y su suma acumulada. Cotizar
+una estadía es entonces una resta de dos sumas acumuladas más el descuento por
+estadía larga. Las señales de ``gestion.signals`` invalidan la cabaña cuando
+cambian sus reglas o su precio base.
+
+Las tablas se guardan en un ``CacheCatalogo`` (ver ``gestion.catalogos``), que
+también las vence a los ``VIGENCIA_TARIFAS`` segundos. Una tabla se rearma
+además si cambió el día (empieza en la fecha en que se armó) o si el precio base
+de la cabaña recibida no es el de la tabla.
+"""
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import accumulate
+
+from django.utils import timezone
+
+from .catalogos import CacheCatalogo
+
+# Días precalculados desde la fecha en que se arma la tabla de una cabaña
+HORIZONTE_TARIFAS = 730
+
+# Segundos que una tabla se considera vigente aunque no se haya invalidado
+VIGENCIA_TARIFAS = 300
+
+# Noches con recargo de fin de semana: viernes y sábado
+NOCHES_FIN_DE_SEMANA = (4, 5)
+
+CENTAVOS = Decimal('0.01')
+CIEN = Decimal('100')
+
+
+def redondear(monto):
+    return monto.quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+def _factor(porcentaje):
+    return 1 + Decimal(porcentaje) / CIEN
+
+
+class TablaPrecios:
+    """Precios por noche de una cabaña desde ``inicio`` y sus sumas acumuladas"""
+
+    def __init__(self, precio_base, reglas, inicio, dias):
+        self.precio_base = Decimal(precio_base)
+        self.inicio = inicio
+        self.temporadas = sorted(
+            (r for r in reglas if r.tipo == 'temporada'),
+            key=lambda r: (r.prioridad, r.idRegla),
+        )
+        self.recargos = [r for r in reglas if r.tipo == 'fin_semana']
+        # Ordenados por mínimo de noches: se aplica el de mayor mínimo que se cumpla
+        self.descuentos = sorted(
+            (r for r in reglas if r.tipo == 'estadia_larga'),
+            key=lambda r: r.min_noches,
+        )
+        self._minimos = [r.min_noches for r in self.descuentos]
+
+        precios = self._pintar(inicio, dias)
+        self.acumulado = [Decimal('0')] + list(accumulate(precios))
+
+    def _pintar(self, inicio, dias):
+        """Precio de cada noche de [inicio, inicio + dias) pintando temporadas y recargos por rangos"""
+        precios = [self.precio_base] * dias
+        base = inicio.toordinal()
+
+        for regla in self.temporadas:
+            precio = regla.precio_noche if regla.precio_noche is not None else self.precio_base * _factor(regla.porcentaje)
+            precio = redondear(Decimal(precio))
+            desde = 0 if regla.fecha_inicio is None else max(regla.fecha_inicio.toordinal() - base, 0)
+            hasta = dias - 1 if regla.fecha_fin is None else min(regla.fecha_fin.toordinal() - base, dias - 1)
+            for posicion in range(desde, hasta + 1):
+                precios[posicion] = precio
+
+        for regla in self.recargos:
+            factor = _factor(regla.porcentaje)
+            desde = 0 if regla.fecha_inicio is None else max(regla.fecha_inicio.toordinal() - base, 0)
+            hasta = dias - 1 if regla.fecha_fin is None else min(regla.fecha_fin.toordinal() - base, dias - 1)
+            # Primera noche de fin de semana dentro del rango y luego de a semanas
+            for posicion in range(desde, min(desde + 7, hasta + 1)):
+                if (base + posicion - 1) % 7 in NOCHES_FIN_DE_SEMANA:
+                    for noche in range(posicion, hasta + 1, 7):
+                        precios[noche] = redondear(precios[noche] * factor)
+
+        return precios
+
+    def subtotal(self, fecha_inicio, fecha_fin):
+        """Suma de las noches de fecha_inicio a fecha_fin (sin incluir la noche de fecha_fin)"""
+        desde = (fecha_inicio - self.inicio).days
+        hasta = (fecha_fin - self.inicio).days
+        if hasta <= desde:
+            return Decimal('0')
+        if 0 <= desde and hasta < len(self.acumulado):
+            return self.acumulado[hasta] - self.acumulado[desde]
+        # Fuera del horizonte precalculado: se calculan solo esas noches
+        return sum(self._pintar(fecha_inicio, hasta - desde), Decimal('0'))
+
+    def descuento(self, noches):
+        """Porcentaje de descuento por estadía larga para la cantidad de noches"""
+        posicion = bisect_right(self._minimos, noches) - 1
+        return self.descuentos[posicion].porcentaje if posicion >= 0 else 0
+
+    def cotizar(self, fecha_inicio, fecha_fin):
+        noches = (fecha_fin - fecha_inicio).days
+        total = self.subtotal(fecha_inicio, fecha_fin)
+        descuento = self.descuento(noches)
+        if descuento:
+            total = total * (1 - Decimal(descuento) / CIEN)
+        return redondear(total)
+
+
+class MotorTarifas(CacheCatalogo):
+    """Tablas de precios por id de cabaña, armadas bajo demanda y en lote"""
+
+    def __init__(self, vigencia=VIGENCIA_TARIFAS):
+        super().__init__(vigencia=vigencia)
+
+    @staticmethod
+    def _armar(cabañas, hoy):
+        """Arma las tablas de las cabañas indicadas con una sola consulta de reglas"""
+        from .models import ReglaTarifa
+
+        reglas_por_cabaña = {}
+        for regla in ReglaTarifa.objects.filter(cabaña__in=cabañas, activa=True).order_by():
+            reglas_por_cabaña.setdefault(regla.cabaña_id, []).append(regla)
+
+        return {
+            cabaña.pk: TablaPrecios(cabaña.precioNoche, reglas_por_cabaña.get(cabaña.pk, []), hoy, HORIZONTE_TARIFAS)
+            for cabaña in cabañas
+        }
+
+    def tablas(self, cabañas):
+        """Tablas de precios por id de cabaña, cargando en lote las que falten"""
+        hoy = timezone.now().date()
+        por_id = {cabaña.pk: cabaña for cabaña in cabañas}
+
+        def vigente(cabaña_id, tabla):
+            # Empieza hoy y usa el precio base actual de la cabaña
+            return tabla.inicio == hoy and tabla.precio_base == Decimal(por_id[cabaña_id].precioNoche)
+
+        return self.obtener_varios(
+            por_id,
+            cargar=lambda faltantes: self._armar([por_id[cabaña_id] for cabaña_id in faltantes], hoy),
+            vigente=vigente,
+        )
+
+
+motor_tarifas = MotorTarifas()
+
+
+def cotizar(cabaña, fecha_inicio, fecha_fin):
+    """Monto de la estadía en la cabaña entre fecha_inicio y fecha_fin"""
+    return motor_tarifas.tablas([cabaña])[cabaña.pk].cotizar(fecha_inicio, fecha_fin)
+
+
+def cotizar_cabañas(cabañas, fecha_inicio, fecha_fin):
+    """Cotiza varias cabañas para el mismo rango de una vez: {id de cabaña: monto}"""
+    tablas = motor_tarifas.tablas(cabañas)
+    return {cabaña_id: tabla.cotizar(fecha_inicio, fecha_fin) for cabaña_id, tabla in tablas.items()}
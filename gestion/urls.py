@@ -21,6 +21,7 @@ urlpatterns = [
     # Módulo Administrador
     path('administrador/dashboard/', views.dashboard_admin, name='dashboard_admin'),
     path('administrador/calendario/', views.calendario_disponibilidad, name='calendario_disponibilidad'),
+    path('administrador/calendario/datos/', views.calendario_disponibilidad_datos, name='calendario_disponibilidad_datos'),
     path('administrador/reservas/', views.gestion_reservas, name='gestion_reservas'),
     path('administrador/reservas/<int:reserva_id>/aprobar/', views.aprobar_reserva, name='aprobar_reserva'),
     path('administrador/reservas/<int:reserva_id>/cancelar/', views.cancelar_reserva, name='cancelar_reserva'),
@@ -29,14 +30,19 @@ urlpatterns = [
     path('administrador/pagos/', views.registro_pagos, name='registro_pagos'),
     path('administrador/notificaciones/', views.panel_notificaciones, name='panel_notificaciones'),
     path('administrador/reportes-faltantes/', views.atender_reportes_faltantes, name='atender_reportes_faltantes'),
+    path('administrador/historial-entregas/', views.historial_entregas, name='historial_entregas'),
 
     # Módulo Encargado
     path('encargado/dashboard/', views.dashboard_encargado, name='dashboard_encargado'),
     path('encargado/preparar-cabañas/', views.preparar_cabañas, name='preparar_cabañas'),
     path('encargado/preparacion-cabaña/<int:reserva_id>/', views.preparacion_cabaña, name='preparacion_cabaña'),
+    path('encargado/preparacion/tareas/<int:item_id>/', views.marcar_tarea_preparacion, name='marcar_tarea_preparacion'),
+    path('encargado/preparacion/inventario/<int:item_id>/', views.actualizar_item_inventario, name='actualizar_item_inventario'),
     path('encargado/checklist-entrega/<int:reserva_id>/', views.checklist_entrega_encargado, name='checklist_entrega_encargado'),
+    path('encargado/verificacion-devolucion/<int:reserva_id>/', views.verificacion_devolucion, name='verificacion_devolucion'),
     path('encargado/inventario/', views.inventario_cabañas, name='inventario_cabañas'),
     path('encargado/reporte-faltantes/', views.reporte_faltantes, name='reporte_faltantes'),
     path('encargado/notificaciones/', views.notificaciones_encargado, name='notificaciones_encargado'),
+    path('notificaciones/nuevas/', views.notificaciones_nuevas, name='notificaciones_nuevas'),
 ]
 
@@ -1,23 +1,43 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate
-from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count, Sum, F
+from django.db.models import Q, Count, Sum, F, Value, ExpressionWrapper, DurationField
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
 from django.utils import timezone
 from datetime import timedelta, date
 from calendar import monthrange
+import json
 from .models import (
     Cliente, Reserva, Cabaña, Encuesta, Pago,
-    Implemento, PrestamoImplemento, Mantenimiento, Notificacion,
-    ChecklistInventario, EntregaCabaña, ItemVerificacion,
-    TareaPreparacion, PreparacionCabaña, ItemPreparacionCompletado, ReporteFaltantes,
+    Implemento, PrestamoImplemento, Mantenimiento, OcupacionDia, Notificacion,
+    EntregaCabaña, ItemVerificacion,
+    PreparacionCabaña, ItemPreparacionCompletado, ReporteFaltantes,
 )
 from .forms import (
     RegistroClienteForm, ReservaForm, EncuestaForm, PagoForm,
     PrestamoImplementoForm, MantenimientoForm, ImplementoForm
 )
 from .decorators import cliente_required, administrador_required, encargado_required
+from .disponibilidad import buscar_cabañas_disponibles
+from .ocupacion import construir_matriz_ocupacion, codificar_matriz, version_ocupacion
+from .tarifas import cotizar, cotizar_cabañas
+from .catalogos import checklist_cabaña
+from .entregas import (
+    instanciar_checklist, aplicar_cargos, resumen_entregas, paginar_entregas,
+    registrar_check_in, registrar_check_out,
+)
+from .preparacion import (
+    iniciar_preparacion, items_de_preparacion, guardar_progreso, porcentaje_de, porcentaje_preparacion,
+    marcar_tarea, actualizar_verificacion,
+)
+from .notificaciones import (
+    notificar, totales_notificaciones, paginar_notificaciones,
+    marcar_notificaciones, eliminar_notificaciones,
+    ultimo_id_notificacion, notificaciones_desde,
+)
 
 
 def login_view(request):
@@ -144,6 +164,10 @@ def solicitar_reserva(request):
     hoy = timezone.now().date()
     fecha_minima = hoy + timedelta(days=4)  # Mínimo 4 días de anticipación
 
+    # Solo mostrar cabañas disponibles (no en mantenimiento)
+    cabañas_disponibles = Cabaña.objects.filter(estado__in=['disponible', 'reservada'])
+    cabañas_alternativas = None
+
     if request.method == 'POST':
         form = ReservaForm(request.POST)
         if form.is_valid():
@@ -158,17 +182,14 @@ def solicitar_reserva(request):
                     f'Debes solicitar la reserva con al menos 4 días de anticipación. '
                     f'La fecha mínima permitida es {fecha_minima.strftime("%d/%m/%Y")}.'
                 )
-                cabañas = Cabaña.objects.filter(estado__in=['disponible', 'reservada'])
-                cabañas_disponibles = [c for c in cabañas if c.estado != 'mantenimiento']
                 return render(request, 'cliente/solicitar_reserva.html', {
                     'form': form,
                     'cabañas': cabañas_disponibles,
                     'fecha_minima': fecha_minima
                 })
 
-            # Calcular monto
-            dias = (reserva.fechaFin - reserva.fechaInicio).days
-            reserva.montoCotizado = reserva.cabaña.precioNoche * dias
+            # Calcular monto según las tarifas de la cabaña
+            reserva.montoCotizado = cotizar(reserva.cabaña, reserva.fechaInicio, reserva.fechaFin)
 
             # Verificar disponibilidad incluyendo mantenimientos
             disponible = Reserva.verificar_disponibilidad_cabaña(
@@ -178,6 +199,19 @@ def solicitar_reserva(request):
             )
 
             if not disponible:
+                # Cabañas alternativas libres en esas fechas y con capacidad suficiente
+                cabañas_alternativas = [
+                    cabaña for cabaña in buscar_cabañas_disponibles(
+                        reserva.fechaInicio,
+                        reserva.fechaFin,
+                        reserva.numPersonas
+                    )
+                    if cabaña.idCabaña != reserva.cabaña.idCabaña
+                ]
+                montos = cotizar_cabañas(cabañas_alternativas, reserva.fechaInicio, reserva.fechaFin)
+                for cabaña in cabañas_alternativas:
+                    cabaña.monto_estimado = montos[cabaña.pk]
+
                 # Verificar si es por mantenimiento
                 mantenimientos = Mantenimiento.objects.filter(
                     cabaña=reserva.cabaña,
@@ -189,15 +223,11 @@ def solicitar_reserva(request):
                         request,
                         f'La cabaña {reserva.cabaña.nombre} está en mantenimiento en esas fechas. Por favor seleccione otra cabaña o fechas alternativas.'
                     )
-                    # Obtener cabañas alternativas disponibles
-                    cabañas_alternativas = Cabaña.objects.filter(
-                        estado__in=['disponible', 'reservada']
-                    ).exclude(idCabaña=reserva.cabaña.idCabaña)
-
-                    if cabañas_alternativas.exists():
-                        messages.info(request, 'Hay otras cabañas disponibles. Consulte la lista a continuación.')
                 else:
                     messages.error(request, 'La cabaña no está disponible en esas fechas.')
+
+                if cabañas_alternativas:
+                    messages.info(request, 'Hay otras cabañas disponibles en esas fechas. Consulte la lista a continuación.')
             else:
                 reserva.save()
                 # Generar alerta inicial
@@ -207,18 +237,10 @@ def solicitar_reserva(request):
     else:
         form = ReservaForm()
 
-    # Solo mostrar cabañas disponibles (no en mantenimiento)
-    cabañas = Cabaña.objects.filter(estado__in=['disponible', 'reservada'])
-
-    # Filtrar cabañas con mantenimiento programado
-    cabañas_disponibles = []
-    for cabaña in cabañas:
-        if cabaña.estado != 'mantenimiento':
-            cabañas_disponibles.append(cabaña)
-
     return render(request, 'cliente/solicitar_reserva.html', {
         'form': form,
         'cabañas': cabañas_disponibles,
+        'cabañas_alternativas': cabañas_alternativas,
         'fecha_minima': fecha_minima
     })
 
@@ -229,14 +251,9 @@ def mis_reservas(request):
     cliente = request.user.cliente
     hoy = timezone.now().date()
 
+    # Los recordatorios a 4 días los envía el comando enviar_recordatorios: esta vista solo lee
     reservas = Reserva.objects.filter(cliente=cliente).select_related('cabaña').order_by('-fechaCreacion')
 
-    # Enviar recordatorios automáticos a 4 días exactos
-    for reserva in reservas:
-        dias_restantes = (reserva.fechaInicio - hoy).days
-        if dias_restantes == 4 and not reserva.confirmacion_cliente and reserva.estado == 'confirmada':
-            reserva.generarAlerta()
-
     # Separar reservas por confirmar (4 días antes)
     reservas_por_confirmar = []
     reservas_otras = []
@@ -359,33 +376,15 @@ def generar_checklist_desde_reserva(reserva):
     # Crear entrega si no existe
     entrega, created = EntregaCabaña.objects.get_or_create(reserva=reserva)
 
-    if created or not entrega.items_verificacion.exists():
-        # Copiar items del checklist base de la cabaña
-        items_base = ChecklistInventario.objects.filter(cabaña=reserva.cabaña).order_by('orden', 'categoria')
-
-        for item in items_base:
-            ItemVerificacion.objects.get_or_create(
-                entrega=entrega,
-                item=item,
-                defaults={
-                    'cantidad_entregada': item.cantidad_esperada,
-                    'estado_entregado': 'bueno'
-                }
-            )
+    # Copiar los items del checklist base de la cabaña que aún no tenga
+    instanciar_checklist(entrega, reserva.cabaña_id)
 
     return entrega
 
 
 def calcular_cargos_devolucion(entrega):
-    """Calcula cargos automáticamente por faltantes y daños"""
-    total_cargos = 0
-    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega)
-
-    for item_ver in items_verificacion:
-        cargo = item_ver.calcular_cargo()
-        total_cargos += cargo
-
-    return total_cargos
+    """Calcula cargos automáticamente por faltantes y daños (un UPDATE para toda la entrega)"""
+    return aplicar_cargos([entrega])[entrega.pk]
 
 
 def iniciar_preparacion_cabañas(reserva):
@@ -394,33 +393,16 @@ def iniciar_preparacion_cabañas(reserva):
     reserva.cabaña.estado = 'en_preparacion'
     reserva.cabaña.save()
 
-    # Crear PreparacionCabaña automáticamente si no existe
-    preparacion, created = PreparacionCabaña.objects.get_or_create(
-        reserva=reserva,
-        defaults={
-            'estado': 'pendiente'
-        }
-    )
+    # Crear PreparacionCabaña con sus tareas si no existe
+    iniciar_preparacion(reserva, estado='pendiente')
 
-    # Si se creó, inicializar tareas de preparación
-    if created:
-        tareas = TareaPreparacion.objects.all().order_by('categoria', 'orden')
-        for tarea in tareas:
-            ItemPreparacionCompletado.objects.create(
-                preparacion=preparacion,
-                tarea=tarea,
-                completado=False
-            )
-
-    # Crear notificación para el encargado
-    usuarios_encargados = User.objects.filter(groups__name='Encargados')
-    for usuario in usuarios_encargados:
-        Notificacion.objects.create(
-            usuario=usuario,
-            tipo='preparacion',
-            mensaje=f'Preparar cabaña {reserva.cabaña.nombre} para reserva #{reserva.idReserva} - Cliente: {reserva.cliente.nombre} - Fecha inicio: {reserva.fechaInicio}',
-            fechaEnvio=timezone.now()
-        )
+    # Notificar a los encargados (se escribe al confirmar la transacción)
+    notificar(
+        f'Preparar cabaña {reserva.cabaña.nombre} para reserva #{reserva.idReserva} - Cliente: {reserva.cliente.nombre} - Fecha inicio: {reserva.fechaInicio}',
+        tipo='preparacion',
+        grupo='Encargados',
+        diferir=True
+    )
 
     # Crear entrega y checklist automático si no existe
     generar_checklist_desde_reserva(reserva)
@@ -441,11 +423,11 @@ def checklist_entrega(request, reserva_id):
     entrega = generar_checklist_desde_reserva(reserva)
 
     # Obtener items de verificación agrupados por categoría
-    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('item__orden', 'item__categoria', 'item__nombre_item')
+    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('orden', 'categoria', 'nombre_item')
 
     categorias_items = {}
     for item_ver in items_verificacion:
-        categoria = item_ver.item.get_categoria_display()
+        categoria = item_ver.get_categoria_display()
         if categoria not in categorias_items:
             categorias_items[categoria] = []
         categorias_items[categoria].append(item_ver)
@@ -483,30 +465,6 @@ def checklist_entrega(request, reserva_id):
     })
 
 
-def enviar_recordatorio_confirmacion():
-    """Función para enviar recordatorios automáticos a 4 días exactos"""
-    hoy = timezone.now().date()
-    fecha_objetivo = hoy + timedelta(days=4)
-
-    reservas_pendientes = Reserva.objects.filter(
-        fechaInicio=fecha_objetivo,
-        confirmacion_cliente=False,
-        estado='confirmada'
-    )
-
-    for reserva in reservas_pendientes:
-        reserva.generarAlerta()
-
-        # Crear notificación adicional
-        if reserva.cliente.usuario:
-            Notificacion.objects.create(
-                usuario=reserva.cliente.usuario,
-                tipo='recordatorio',
-                mensaje=f'URGENTE: Confirme su reserva en {reserva.cabaña.nombre} que inicia en 4 días ({reserva.fechaInicio}). Acceda a "Mis Reservas" para confirmar.',
-                fechaEnvio=timezone.now()
-            )
-
-
 # ============ MÓDULO ADMINISTRADOR ============
 
 @administrador_required
@@ -528,10 +486,11 @@ def dashboard_admin(request):
         fechaPago__month=hoy.month
     ).aggregate(total=Sum('monto'))['total'] or 0
 
-    ocupacion_actual = Reserva.objects.filter(
-        fechaInicio__lte=hoy,
-        fechaFin__gte=hoy,
-        estado='confirmada'
+    # Cabañas ocupadas hoy por una reserva confirmada (tabla de ocupación materializada)
+    ocupacion_actual = OcupacionDia.objects.filter(
+        fecha=hoy,
+        estado='reservada',
+        reserva__estado='confirmada'
     ).count()
 
     total_cabañas = Cabaña.objects.count()
@@ -721,7 +680,7 @@ def dashboard_encargado(request):
     # Preparaciones activas (para mostrar en las tablas)
     preparaciones_activas = PreparacionCabaña.objects.filter(
         reserva__in=reservas_proximas
-    ).select_related('reserva', 'reserva__cabaña', 'encargado')
+    ).select_related('reserva', 'reserva__cabaña', 'encargado').con_avance()
 
     # Reportes de faltantes pendientes
     reportes_faltantes_pendientes = ReporteFaltantes.objects.filter(
@@ -829,55 +788,39 @@ def preparar_cabañas(request):
     """Lista de cabañas que requieren preparación"""
     hoy = timezone.now().date()
 
-    # Mostrar todas las reservas confirmadas por el cliente que están en el futuro
-    # (hasta 7 días para tener un margen razonable)
-    reservas_proximas = Reserva.objects.filter(
-        fechaInicio__gte=hoy,
-        fechaInicio__lte=hoy + timedelta(days=7),
+    # Reservas confirmadas por el cliente que inician dentro de 7 días, más las que
+    # ya tienen una preparación abierta aunque estén más lejos, con su preparación,
+    # encargado, avance y días restantes en una sola consulta
+    reservas = Reserva.objects.filter(
+        Q(fechaInicio__gte=hoy, fechaInicio__lte=hoy + timedelta(days=7)) |
+        Q(preparacion__estado__in=['pendiente', 'en_proceso']),
         estado='confirmada',
-        confirmacion_cliente=True
-    ).select_related('cliente', 'cabaña', 'entrega').order_by('fechaInicio')
-
-    # También incluir reservas con preparaciones existentes, aunque estén más lejos
-    preparaciones_existentes = PreparacionCabaña.objects.filter(
-        estado__in=['pendiente', 'en_proceso']
-    ).select_related('reserva', 'reserva__cliente', 'reserva__cabaña', 'reserva__entrega', 'encargado')
-
-    # Obtener IDs de reservas que ya están en reservas_proximas
-    ids_reservas_proximas = set(reservas_proximas.values_list('idReserva', flat=True))
-
-    # Agregar reservas de preparaciones existentes que no estén ya en reservas_proximas
-    reservas_adicionales = []
-    for prep in preparaciones_existentes:
-        if prep.reserva.idReserva not in ids_reservas_proximas:
-            # Verificar que la reserva esté confirmada por el cliente
-            if prep.reserva.estado == 'confirmada' and prep.reserva.confirmacion_cliente:
-                reservas_adicionales.append(prep.reserva)
+        confirmacion_cliente=True,
+    ).select_related(
+        'cliente', 'cabaña', 'entrega', 'preparacion', 'preparacion__encargado'
+    ).annotate(
+        total_tareas=Count('preparacion__items_preparacion'),
+        tareas_completadas=Count(
+            'preparacion__items_preparacion', filter=Q(preparacion__items_preparacion__completado=True)
+        ),
+        tiempo_restante=ExpressionWrapper(F('fechaInicio') - Value(hoy), output_field=DurationField()),
+    ).order_by('fechaInicio', 'idReserva')
 
-    # Combinar ambas listas
-    todas_reservas = list(reservas_proximas) + reservas_adicionales
-    todas_reservas = sorted(todas_reservas, key=lambda r: r.fechaInicio)
-
-    # Calcular días restantes para cada reserva
     reservas_con_dias = []
-    for reserva in todas_reservas:
-        dias_restantes = (reserva.fechaInicio - hoy).days
+    for reserva in reservas:
+        preparacion = getattr(reserva, 'preparacion', None)
+        if preparacion is not None:
+            # Deja el avance anotado donde lo busca porcentaje_completado()
+            preparacion.total_tareas = reserva.total_tareas
+            preparacion.tareas_completadas = reserva.tareas_completadas
         reservas_con_dias.append({
             'reserva': reserva,
-            'dias_restantes': dias_restantes
+            'preparacion': preparacion,
+            'dias_restantes': reserva.tiempo_restante.days,
         })
 
-    # Preparaciones existentes (todas, no solo las de reservas_proximas)
-    todas_ids_reservas = [r['reserva'].idReserva for r in reservas_con_dias]
-    preparaciones = PreparacionCabaña.objects.filter(
-        reserva__idReserva__in=todas_ids_reservas
-    ).select_related('reserva', 'encargado')
-
-    preparaciones_dict = {p.reserva.idReserva: p for p in preparaciones}
-
     return render(request, 'encargado/preparar_cabañas.html', {
         'reservas_con_dias': reservas_con_dias,
-        'preparaciones': preparaciones_dict,
         'hoy': hoy
     })
 
@@ -887,45 +830,18 @@ def preparacion_cabaña(request, reserva_id):
     """Vista detallada de preparación de cabaña"""
     reserva = get_object_or_404(Reserva, idReserva=reserva_id)
 
-    # Crear o obtener preparación
-    preparacion, created = PreparacionCabaña.objects.get_or_create(
-        reserva=reserva,
-        defaults={
-            'encargado': request.user,
-            'estado': 'en_proceso'
-        }
-    )
-
-    if created:
-        # Inicializar tareas de preparación
-        tareas = TareaPreparacion.objects.all().order_by('categoria', 'orden')
-        for tarea in tareas:
-            ItemPreparacionCompletado.objects.create(
-                preparacion=preparacion,
-                tarea=tarea,
-                completado=False
-            )
+    # Crear u obtener la preparación (con sus tareas, si se crea)
+    preparacion, created = iniciar_preparacion(reserva, encargado=request.user, estado='en_proceso')
 
     # Crear o obtener entrega para verificación de inventario
     entrega, entrega_created = EntregaCabaña.objects.get_or_create(reserva=reserva)
 
-    # Obtener items del checklist base
-    items_checklist_base = ChecklistInventario.objects.filter(cabaña=reserva.cabaña).order_by('orden', 'categoria')
-
-    # Crear ItemVerificacion para cada item del checklist si no existen
+    # Crear ItemVerificacion para cada item del checklist que no lo tenga
     # Iniciar con estado 'regular' para que los checkboxes empiecen desmarcados
-    for item_checklist in items_checklist_base:
-        ItemVerificacion.objects.get_or_create(
-            entrega=entrega,
-            item=item_checklist,
-            defaults={
-                'cantidad_entregada': item_checklist.cantidad_esperada,
-                'estado_entregado': 'regular'  # Cambiar a 'regular' para que checkboxes empiecen desmarcados
-            }
-        )
+    instanciar_checklist(entrega, reserva.cabaña_id, estado_inicial='regular')
 
     # Obtener items de verificación para la preparación
-    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('item__orden', 'item__categoria')
+    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('orden', 'categoria', 'nombre_item')
 
     # Verificar si hay faltantes críticos pendientes
     tiene_faltantes_criticos = ReporteFaltantes.objects.filter(
@@ -934,10 +850,8 @@ def preparacion_cabaña(request, reserva_id):
         faltantes_criticos=True
     ).exists()
 
-    # Obtener items de preparación agrupados por categoría
-    items_preparacion = ItemPreparacionCompletado.objects.filter(
-        preparacion=preparacion
-    ).select_related('tarea').order_by('tarea__categoria', 'tarea__orden')
+    # Obtener items de preparación agrupados por categoría (tareas del catálogo en memoria)
+    items_preparacion = items_de_preparacion(preparacion)
 
     tareas_por_categoria = {}
     for item in items_preparacion:
@@ -946,55 +860,14 @@ def preparacion_cabaña(request, reserva_id):
             tareas_por_categoria[categoria_display] = []
         tareas_por_categoria[categoria_display].append(item)
 
-    porcentaje_completado = preparacion.porcentaje_completado()
+    porcentaje_completado = porcentaje_de(items_preparacion)
     dias_restantes = (reserva.fechaInicio - timezone.now().date()).days
 
     if request.method == 'POST':
         accion = request.POST.get('accion', '')
 
-        # Procesar tareas completadas
-        tareas_completadas = request.POST.getlist('tareas_completadas')
-
-        # Actualizar estado de tareas
-        for item in items_preparacion:
-            tarea_id = str(item.tarea.idTareaPreparacion)
-            if tarea_id in tareas_completadas:
-                if not item.completado:
-                    item.completado = True
-                    item.fecha_completado = timezone.now()
-                    item.save()
-            else:
-                if item.completado:
-                    item.completado = False
-                    item.fecha_completado = None
-                    item.save()
-
-        # Procesar verificación de inventario
-        for item_ver in items_verificacion:
-            item_id = str(item_ver.item.idChecklist)
-            verificado = request.POST.get(f'inventario_verificado_{item_id}') == 'on'
-            cantidad_actual = request.POST.get(f'inventario_cantidad_{item_id}', item_ver.item.cantidad_esperada)
-            estado_item = request.POST.get(f'inventario_estado_{item_id}', 'regular')
-            observaciones = request.POST.get(f'inventario_obs_{item_id}', '')
-
-            # Actualizar cantidad_entregada (que representa la cantidad actual durante preparación)
-            try:
-                item_ver.cantidad_entregada = int(cantidad_actual)
-            except (ValueError, TypeError):
-                item_ver.cantidad_entregada = item_ver.item.cantidad_esperada
-
-            # Si el checkbox está marcado, forzar estado a 'bueno'
-            # Si no está marcado, mantener el estado seleccionado en el select
-            if verificado:
-                item_ver.estado_entregado = 'bueno'
-            else:
-                # Mantener el estado seleccionado en el select (o 'regular' si no se seleccionó nada)
-                item_ver.estado_entregado = estado_item if estado_item else 'regular'
-
-            if observaciones:
-                item_ver.observaciones = observaciones
-
-            item_ver.save()
+        # Guardar solo las tareas e items de inventario que cambiaron
+        porcentaje = guardar_progreso(items_preparacion, items_verificacion, request.POST)
 
         # Procesar reporte de faltantes
         if accion == 'crear_reporte_faltantes':
@@ -1022,9 +895,6 @@ def preparacion_cabaña(request, reserva_id):
         observaciones = request.POST.get('observaciones', '')
         preparacion.observaciones = observaciones
 
-        # Verificar si todas las tareas están completadas
-        porcentaje = preparacion.porcentaje_completado()
-
         # Verificar si se presionó el botón "Completar Preparación"
         completar_preparacion = request.POST.get('completar_preparacion')
 
@@ -1103,15 +973,94 @@ def preparacion_cabaña(request, reserva_id):
     })
 
 
+def _json_patch(request):
+    """Cuerpo JSON (objeto) de una petición PATCH; lanza ValueError si no es válido"""
+    try:
+        datos = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('El cuerpo debe ser JSON.')
+    if not isinstance(datos, dict):
+        raise ValueError('El cuerpo debe ser un objeto JSON.')
+    return datos
+
+
+@encargado_required
+@require_http_methods(['PATCH'])
+def marcar_tarea_preparacion(request, item_id):
+    """Marca o desmarca una tarea de preparación: {"completado": true|false}"""
+    item = get_object_or_404(ItemPreparacionCompletado, idItemPreparacion=item_id)
+    try:
+        datos = _json_patch(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not isinstance(datos.get('completado'), bool):
+        return JsonResponse({'error': 'Se requiere "completado" (true o false).'}, status=400)
+
+    marcar_tarea(item, datos['completado'])
+    return JsonResponse({
+        'id': item.idItemPreparacion,
+        'completado': item.completado,
+        'fecha_completado': (
+            timezone.localtime(item.fecha_completado).strftime('%d/%m/%Y %H:%M') if item.fecha_completado else None
+        ),
+        'porcentaje_completado': porcentaje_preparacion(item.preparacion_id),
+    })
+
+
+@encargado_required
+@require_http_methods(['PATCH'])
+def actualizar_item_inventario(request, item_id):
+    """
+    Actualiza la verificación de un item de inventario durante la preparación:
+    {"cantidad": n, "estado": "...", "verificado": true|false, "observaciones": "..."}
+    (todos opcionales). "verificado": true equivale a estado "bueno".
+    """
+    item_ver = get_object_or_404(
+        ItemVerificacion.objects.select_related('entrega__reserva__preparacion'),
+        idItemVerificacion=item_id,
+    )
+    try:
+        datos = _json_patch(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    campos = {}
+    if 'cantidad' in datos:
+        cantidad = datos['cantidad']
+        if isinstance(cantidad, bool) or not isinstance(cantidad, int) or cantidad < 0:
+            return JsonResponse({'error': '"cantidad" debe ser un entero no negativo.'}, status=400)
+        campos['cantidad_entregada'] = cantidad
+    if 'estado' in datos:
+        if datos['estado'] not in dict(ItemVerificacion.ESTADOS):
+            return JsonResponse({'error': '"estado" no es válido.'}, status=400)
+        campos['estado_entregado'] = datos['estado']
+    if datos.get('verificado') is True:
+        campos['estado_entregado'] = 'bueno'
+    if 'observaciones' in datos:
+        if not isinstance(datos['observaciones'], str):
+            return JsonResponse({'error': '"observaciones" debe ser texto.'}, status=400)
+        campos['observaciones'] = datos['observaciones']
+
+    actualizar_verificacion(item_ver, **campos)
+    preparacion = getattr(item_ver.entrega.reserva, 'preparacion', None)
+    return JsonResponse({
+        'id': item_ver.idItemVerificacion,
+        'cantidad': item_ver.cantidad_entregada,
+        'estado': item_ver.estado_entregado,
+        'observaciones': item_ver.observaciones,
+        'porcentaje_completado': porcentaje_preparacion(preparacion.pk) if preparacion else 0,
+    })
+
+
 @encargado_required
 def checklist_entrega_encargado(request, reserva_id):
     """Checklist de entrega para encargados - Check-in"""
     reserva = get_object_or_404(Reserva, idReserva=reserva_id)
 
     # Verificar que existe checklist base para esta cabaña
-    items_checklist_base = ChecklistInventario.objects.filter(cabaña=reserva.cabaña)
+    items_checklist_base = checklist_cabaña(reserva.cabaña_id)
 
-    if not items_checklist_base.exists():
+    if not items_checklist_base:
         messages.warning(
             request,
             f'⚠️ No hay items configurados en el checklist para {reserva.cabaña.nombre}. '
@@ -1123,41 +1072,11 @@ def checklist_entrega_encargado(request, reserva_id):
     entrega = generar_checklist_desde_reserva(reserva)
 
     # Obtener items de verificación (sin agrupar por categoría)
-    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('item__orden', 'item__categoria', 'item__nombre_item')
-
-    if not items_verificacion.exists():
-        # Si no hay items de verificación, crearlos desde el checklist base
-        for item_checklist in items_checklist_base:
-            ItemVerificacion.objects.get_or_create(
-                entrega=entrega,
-                item=item_checklist,
-                defaults={
-                    'cantidad_entregada': item_checklist.cantidad_esperada,
-                    'estado_entregado': 'bueno'
-                }
-            )
-        items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('item__orden', 'item__categoria', 'item__nombre_item')
+    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('orden', 'categoria', 'nombre_item')
 
     if request.method == 'POST':
-        # Procesar verificación del encargado
-        entrega.fecha_entrega = timezone.now()
-        entrega.encargado_entrega = request.user
-        entrega.estado = 'entregada'
-        entrega.observaciones_entrega = request.POST.get('observaciones_entrega', '')
-
-        # Actualizar items de verificación
-        for item_ver in items_verificacion:
-            cantidad_entregada = request.POST.get(f'cantidad_{item_ver.idItemVerificacion}', item_ver.item.cantidad_esperada)
-            estado_entregado = request.POST.get(f'estado_{item_ver.idItemVerificacion}', 'bueno')
-            observaciones_item = request.POST.get(f'obs_{item_ver.idItemVerificacion}', '')
-
-            item_ver.cantidad_entregada = int(cantidad_entregada)
-            item_ver.estado_entregado = estado_entregado
-            if observaciones_item:
-                item_ver.observaciones = observaciones_item
-            item_ver.save()
-
-        entrega.save()
+        # Procesar verificación del encargado (un bulk_update y la entrega, en una transacción)
+        registrar_check_in(entrega, items_verificacion, request.POST, request.user)
 
         messages.success(request, f'Checklist de entrega completado para {reserva.cabaña.nombre}. El cliente puede confirmar la recepción.')
         return redirect('dashboard_encargado')
@@ -1176,37 +1095,18 @@ def verificacion_devolucion(request, reserva_id):
     entrega = get_object_or_404(EntregaCabaña, reserva=reserva)
 
     # Obtener items de verificación
-    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('item__orden', 'item__categoria', 'item__nombre_item')
+    items_verificacion = ItemVerificacion.objects.filter(entrega=entrega).order_by('orden', 'categoria', 'nombre_item')
 
     categorias_items = {}
     for item_ver in items_verificacion:
-        categoria = item_ver.item.get_categoria_display()
+        categoria = item_ver.get_categoria_display()
         if categoria not in categorias_items:
             categorias_items[categoria] = []
         categorias_items[categoria].append(item_ver)
 
     if request.method == 'POST':
-        # Procesar verificación de devolución
-        entrega.fecha_devolucion = timezone.now()
-        entrega.estado = 'verificada'
-        entrega.observaciones_devolucion = request.POST.get('observaciones_devolucion', '')
-
-        # Actualizar items de verificación
-        for item_ver in items_verificacion:
-            cantidad_devuelta = request.POST.get(f'cantidad_{item_ver.idItemVerificacion}', 0)
-            estado_devuelto = request.POST.get(f'estado_{item_ver.idItemVerificacion}', 'bueno')
-            observaciones_item = request.POST.get(f'obs_{item_ver.idItemVerificacion}', '')
-
-            item_ver.cantidad_devuelta = int(cantidad_devuelta)
-            item_ver.estado_devuelto = estado_devuelto
-            if observaciones_item:
-                item_ver.observaciones += f"\n[Check-out] {observaciones_item}"
-            item_ver.save()
-
-        entrega.save()
-
-        # Calcular cargos automáticamente
-        total_cargos = calcular_cargos_devolucion(entrega)
+        # Procesar verificación de devolución y calcular cargos en una transacción
+        total_cargos = registrar_check_out(entrega, items_verificacion, request.POST)
 
         messages.success(request, f'Verificación de devolución completada. Cargos totales: ${total_cargos:.2f}')
         return redirect('historial_entregas')
@@ -1225,46 +1125,39 @@ def verificacion_devolucion(request, reserva_id):
 
 @administrador_required
 def historial_entregas(request):
-    """Historial de entregas para administradores"""
-    entregas = EntregaCabaña.objects.all().order_by('-fecha_entrega')
-
-    # Métricas
-    total_entregas = entregas.count()
-    entregas_completadas = entregas.filter(estado='verificada').count()
-
-    # Calcular total de cargos de forma eficiente
-    total_cargos = ItemVerificacion.objects.filter(
-        entrega__estado='verificada'
-    ).aggregate(total=Sum('cargo_aplicado'))['total'] or 0
+    """Historial de entregas para administradores, paginado por clave"""
+    # Métricas (un solo agregado)
+    resumen = resumen_entregas()
 
     # Items más frecuentemente dañados
     items_danados = ItemVerificacion.objects.filter(
         estado_devuelto__in=['danado', 'faltante'],
         requiere_reposicion=True
-    ).values('item__nombre_item').annotate(
+    ).values('nombre_item').annotate(
         veces_danado=Count('idItemVerificacion'),
         cargo_total=Sum('cargo_aplicado')
     ).order_by('-veces_danado')[:10]
 
+    entregas = EntregaCabaña.objects.all()
     estado_filtro = request.GET.get('estado', '')
     if estado_filtro:
         entregas = entregas.filter(estado=estado_filtro)
 
-    # Calcular cargos por entrega para el template
-    entregas_con_cargos = []
-    for entrega in entregas:
-        cargo_entrega = sum(
-            float(item.cargo_aplicado or 0)
-            for item in entrega.items_verificacion.all()
-        )
-        entregas_con_cargos.append((entrega, cargo_entrega))
+    # Página por clave indexada; los cargos se suman solo para sus entregas
+    pagina = paginar_entregas(
+        entregas,
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+    )
 
     return render(request, 'admin/historial_entregas.html', {
-        'entregas_con_cargos': entregas_con_cargos,
-        'total_entregas': total_entregas,
-        'entregas_completadas': entregas_completadas,
-        'total_cargos': total_cargos,
+        'entregas': pagina['entregas'],
+        'pagina': pagina,
+        'total_entregas': resumen['total_entregas'],
+        'entregas_completadas': resumen['entregas_completadas'],
+        'total_cargos': resumen['total_cargos'],
         'items_danados': items_danados,
+        'estados': EntregaCabaña.ESTADOS,
         'estado_filtro': estado_filtro
     })
 
@@ -1277,17 +1170,23 @@ def gestion_incidentes(request):
         estado__in=['programado', 'en_proceso']
     ).order_by('-fechaProgramada')
 
-    # Reservas afectadas por mantenimientos
+    # Reservas afectadas por mantenimientos: una sola consulta para todas las cabañas involucradas
     hoy = timezone.now().date()
+    mantenimientos_activos = list(mantenimientos_activos.select_related('cabaña'))
+    reservas_por_cabaña = {}
+    for reserva in Reserva.objects.filter(
+        cabaña_id__in={m.cabaña_id for m in mantenimientos_activos},
+        estado__in=['confirmada', 'pendiente'],
+        fechaInicio__gte=hoy
+    ).select_related('cliente', 'cabaña'):
+        reservas_por_cabaña.setdefault(reserva.cabaña_id, []).append(reserva)
+
     reservas_afectadas = []
     for mantenimiento in mantenimientos_activos:
-        reservas = Reserva.objects.filter(
-            cabaña=mantenimiento.cabaña,
-            estado__in=['confirmada', 'pendiente'],
-            fechaInicio__gte=hoy,
-            fechaFin__gte=mantenimiento.fechaProgramada
-        )
-        reservas_afectadas.extend([(mantenimiento, r) for r in reservas])
+        reservas_afectadas.extend([
+            (mantenimiento, r) for r in reservas_por_cabaña.get(mantenimiento.cabaña_id, [])
+            if r.fechaFin >= mantenimiento.fechaProgramada
+        ])
 
     if request.method == 'POST':
         accion = request.POST.get('accion')
@@ -1306,13 +1205,10 @@ def gestion_incidentes(request):
                 reserva.save()
 
                 # Notificar al cliente
-                if reserva.cliente.usuario:
-                    Notificacion.objects.create(
-                        usuario=reserva.cliente.usuario,
-                        tipo='general',
-                        mensaje=f'Su reserva #{reserva.idReserva} ha sido reasignada a {nueva_cabaña.nombre} debido a mantenimiento en la cabaña original.',
-                        fechaEnvio=timezone.now()
-                    )
+                notificar(
+                    f'Su reserva #{reserva.idReserva} ha sido reasignada a {nueva_cabaña.nombre} debido a mantenimiento en la cabaña original.',
+                    usuarios=[reserva.cliente.usuario_id]
+                )
 
                 messages.success(request, f'Reserva #{reserva.idReserva} reasignada exitosamente a {nueva_cabaña.nombre}.')
             else:
@@ -1334,19 +1230,15 @@ def gestion_incidentes(request):
             if Reserva.verificar_disponibilidad_cabaña(reserva.cabaña, nueva_inicio, nueva_fin):
                 reserva.fechaInicio = nueva_inicio
                 reserva.fechaFin = nueva_fin
-                # Recalcular monto
-                dias = (nueva_fin - nueva_inicio).days
-                reserva.montoCotizado = reserva.cabaña.precioNoche * dias
+                # Recalcular monto según las tarifas de la cabaña
+                reserva.montoCotizado = cotizar(reserva.cabaña, nueva_inicio, nueva_fin)
                 reserva.save()
 
                 # Notificar al cliente
-                if reserva.cliente.usuario:
-                    Notificacion.objects.create(
-                        usuario=reserva.cliente.usuario,
-                        tipo='general',
-                        mensaje=f'Su reserva #{reserva.idReserva} ha sido reprogramada para {nueva_inicio} - {nueva_fin} debido a mantenimiento.',
-                        fechaEnvio=timezone.now()
-                    )
+                notificar(
+                    f'Su reserva #{reserva.idReserva} ha sido reprogramada para {nueva_inicio} - {nueva_fin} debido a mantenimiento.',
+                    usuarios=[reserva.cliente.usuario_id]
+                )
 
                 messages.success(request, f'Reserva #{reserva.idReserva} reprogramada exitosamente.')
             else:
@@ -1360,13 +1252,10 @@ def gestion_incidentes(request):
             reserva.save()
 
             # Notificar al cliente
-            if reserva.cliente.usuario:
-                Notificacion.objects.create(
-                    usuario=reserva.cliente.usuario,
-                    tipo='general',
-                    mensaje=f'Su reserva #{reserva.idReserva} ha sido cancelada debido a mantenimiento. Contacte al administrador para más información.',
-                    fechaEnvio=timezone.now()
-                )
+            notificar(
+                f'Su reserva #{reserva.idReserva} ha sido cancelada debido a mantenimiento. Contacte al administrador para más información.',
+                usuarios=[reserva.cliente.usuario_id]
+            )
 
             messages.success(request, f'Reserva #{reserva.idReserva} cancelada exitosamente.')
 
@@ -1418,59 +1307,17 @@ def calendario_disponibilidad(request):
     # Obtener todas las cabañas
     cabañas = Cabaña.objects.all().order_by('nombre')
 
-    # Obtener reservas del mes
+    # Construir datos del calendario
     fecha_inicio_mes = date(año, mes, 1)
     fecha_fin_mes = date(año, mes, dias_mes)
+    calendario_data = construir_matriz_ocupacion(cabañas, fecha_inicio_mes, fecha_fin_mes)
 
-    reservas = Reserva.objects.filter(
-        fechaInicio__lte=fecha_fin_mes,
-        fechaFin__gte=fecha_inicio_mes,
-        estado__in=['confirmada', 'pendiente']
-    ).select_related('cabaña', 'cliente')
-
-    # Obtener mantenimientos del mes
-    mantenimientos = Mantenimiento.objects.filter(
-        fechaProgramada__lte=fecha_fin_mes,
-        fechaProgramada__gte=fecha_inicio_mes,
-        estado__in=['programado', 'en_proceso']
-    ).select_related('cabaña')
-
-    # Construir datos del calendario
-    calendario_data = []
-    for cabaña in cabañas:
-        fila = {
-            'cabaña': cabaña,
-            'dias': []
-        }
-
-        for dia in range(1, dias_mes + 1):
-            fecha_dia = date(año, mes, dia)
-            dia_info = {
-                'estado': 'disponible',
-                'es_hoy': fecha_dia == hoy,
-                'reserva': None
-            }
-
-            # Verificar si hay reserva
-            for reserva in reservas:
-                if reserva.cabaña == cabaña and reserva.fechaInicio <= fecha_dia <= reserva.fechaFin:
-                    dia_info['estado'] = 'reservada'
-                    dia_info['reserva'] = reserva
-                    break
-
-            # Verificar si hay mantenimiento
-            if dia_info['estado'] == 'disponible':
-                for mantenimiento in mantenimientos:
-                    if mantenimiento.cabaña == cabaña and mantenimiento.fechaProgramada == fecha_dia:
-                        dia_info['estado'] = 'mantenimiento'
-                        break
-
-            fila['dias'].append(dia_info)
-
-        calendario_data.append(fila)
+    # Día del mes que corresponde a hoy (0 si el mes mostrado no es el actual)
+    dia_hoy = hoy.day if (hoy.year, hoy.month) == (año, mes) else 0
 
     return render(request, 'admin/calendario_disponibilidad.html', {
         'calendario_data': calendario_data,
+        'dia_hoy': dia_hoy,
         'mes': mes,
         'año': año,
         'mes_nombre': mes_nombre,
@@ -1482,6 +1329,54 @@ def calendario_disponibilidad(request):
     })
 
 
+# Rango máximo que puede pedirse al endpoint JSON del calendario
+MAX_DIAS_CALENDARIO = 366
+
+
+def _rango_calendario(request):
+    """Rango pedido con ?desde=&hasta= (ISO) o con ?mes=&año=; lanza ValueError si no es válido"""
+    hoy = timezone.now().date()
+    if 'desde' in request.GET or 'hasta' in request.GET:
+        desde = date.fromisoformat(request.GET.get('desde', ''))
+        hasta = date.fromisoformat(request.GET.get('hasta', ''))
+    else:
+        mes = int(request.GET.get('mes', hoy.month))
+        año = int(request.GET.get('año', hoy.year))
+        desde = date(año, mes, 1)
+        hasta = date(año, mes, monthrange(año, mes)[1])
+
+    if hasta < desde or (hasta - desde).days >= MAX_DIAS_CALENDARIO:
+        raise ValueError('Rango de fechas inválido')
+    return desde, hasta
+
+
+def _etag_calendario(request):
+    """ETag del calendario: cambia cuando cambian la ocupación o los nombres del rango pedido"""
+    try:
+        desde, hasta = _rango_calendario(request)
+    except ValueError:
+        return None
+    return version_ocupacion(desde, hasta)
+
+
+@administrador_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_calendario)
+def calendario_disponibilidad_datos(request):
+    """Grilla cabaña × día del calendario en JSON compacto, con GET condicional por ETag"""
+    try:
+        desde, hasta = _rango_calendario(request)
+    except ValueError:
+        return JsonResponse(
+            {'error': f'Rango inválido. Use ?mes=&año= o ?desde=&hasta= (máximo {MAX_DIAS_CALENDARIO} días).'},
+            status=400
+        )
+
+    cabañas = Cabaña.objects.all().order_by('nombre')
+    datos = codificar_matriz(construir_matriz_ocupacion(cabañas, desde, hasta), desde, hasta)
+    return JsonResponse(datos, json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+
+
 @administrador_required
 def gestion_cabañas(request):
     """Gestión de cabañas"""
@@ -1510,13 +1405,49 @@ def gestion_cabañas(request):
     return render(request, 'admin/gestion_cabañas.html', {'cabañas': cabañas})
 
 
+ACCIONES_MASIVAS_NOTIFICACIONES = (
+    'marcar_leidas_todas', 'marcar_leidas_seleccionadas', 'marcar_leidas_filtradas',
+    'eliminar_filtradas', 'eliminar_antiguas',
+)
+
+
+def _accion_masiva_notificaciones(request, accion, notificaciones, filtradas):
+    """
+    Acciones sobre varias notificaciones a la vez, cada una un solo UPDATE o DELETE.
+    notificaciones: todas las que el usuario puede gestionar; filtradas: las del filtro actual.
+    """
+    if accion == 'marcar_leidas_todas':
+        cantidad = marcar_notificaciones(notificaciones)
+        messages.success(request, f'{cantidad} notificaciones marcadas como leídas.')
+    elif accion == 'marcar_leidas_seleccionadas':
+        seleccionadas = [i for i in request.POST.getlist('seleccionadas') if i.isdigit()]
+        cantidad = marcar_notificaciones(notificaciones.filter(idNotificacion__in=seleccionadas))
+        messages.success(request, f'{cantidad} notificaciones seleccionadas marcadas como leídas.')
+    elif accion == 'marcar_leidas_filtradas':
+        cantidad = marcar_notificaciones(filtradas)
+        messages.success(request, f'{cantidad} notificaciones del filtro actual marcadas como leídas.')
+    elif accion == 'eliminar_filtradas':
+        cantidad = eliminar_notificaciones(filtradas)
+        messages.success(request, f'{cantidad} notificaciones del filtro actual eliminadas.')
+    elif accion == 'eliminar_antiguas':
+        try:
+            dias = int(request.POST.get('dias', ''))
+            if dias < 1:
+                raise ValueError
+        except ValueError:
+            messages.error(request, 'Indique una cantidad de días válida.')
+            return
+        cantidad = eliminar_notificaciones(filtradas.filter(fechaEnvio__lt=timezone.now() - timedelta(days=dias)))
+        messages.success(request, f'{cantidad} notificaciones con más de {dias} días eliminadas.')
+
+
 @administrador_required
 def panel_notificaciones(request):
     """Panel de notificaciones del administrador"""
     tipo_filtro = request.GET.get('tipo', '')
     leida_filtro = request.GET.get('leida', '')
 
-    notificaciones = Notificacion.objects.all().order_by('-fechaEnvio')
+    notificaciones = Notificacion.objects.select_related('usuario')
 
     if tipo_filtro:
         notificaciones = notificaciones.filter(tipo=tipo_filtro)
@@ -1526,11 +1457,14 @@ def panel_notificaciones(request):
     elif leida_filtro == 'false':
         notificaciones = notificaciones.filter(leida=False)
 
-    total_notificaciones = Notificacion.objects.count()
-    notificaciones_no_leidas = Notificacion.objects.filter(leida=False).count()
+    total_notificaciones, notificaciones_no_leidas = totales_notificaciones()
 
     if request.method == 'POST':
         accion = request.POST.get('accion')
+        if accion in ACCIONES_MASIVAS_NOTIFICACIONES:
+            _accion_masiva_notificaciones(request, accion, Notificacion.objects.all(), notificaciones)
+            return redirect(request.get_full_path())
+
         notificacion_id = request.POST.get('notificacion_id')
         notificacion = get_object_or_404(Notificacion, idNotificacion=notificacion_id)
 
@@ -1546,10 +1480,14 @@ def panel_notificaciones(request):
             notificacion.delete()
             messages.success(request, 'Notificación eliminada.')
 
-        return redirect('panel_notificaciones')
+        # Volver a la misma página y filtros
+        return redirect(request.get_full_path())
+
+    pagina = paginar_notificaciones(notificaciones, request.GET.get('despues'), request.GET.get('antes'))
 
     return render(request, 'admin/panel_notificaciones.html', {
-        'notificaciones': notificaciones,
+        'notificaciones': pagina['notificaciones'],
+        'pagina': pagina,
         'total_notificaciones': total_notificaciones,
         'notificaciones_no_leidas': notificaciones_no_leidas,
         'tipo_filtro': tipo_filtro,
@@ -1612,7 +1550,7 @@ def reporte_faltantes(request):
 
     items_faltantes_raw = ItemVerificacion.objects.filter(
         cantidad_devuelta__lt=F('cantidad_entregada')
-    ).select_related('entrega', 'item', 'entrega__reserva', 'entrega__reserva__cabaña').order_by('-entrega__fecha_devolucion')
+    ).select_related('entrega', 'entrega__reserva', 'entrega__reserva__cabaña').order_by('-entrega__fecha_devolucion')
 
     items_faltantes = []
     for item in items_faltantes_raw:
@@ -1633,8 +1571,8 @@ def reporte_faltantes(request):
     valor_reposicion = 0
     for item_data in items_faltantes:
         item_ver = item_data['item']
-        if item_ver.item and hasattr(item_ver.item, 'precio_reposicion') and item_ver.item.precio_reposicion:
-            valor_reposicion += item_data['faltantes'] * float(item_ver.item.precio_reposicion)
+        if item_ver.precio_reposicion:
+            valor_reposicion += item_data['faltantes'] * float(item_ver.precio_reposicion)
 
     return render(request, 'encargado/reporte_faltantes.html', {
         'implementos_faltantes': implementos_faltantes,
@@ -1652,7 +1590,7 @@ def notificaciones_encargado(request):
     tipo_filtro = request.GET.get('tipo', '')
     leida_filtro = request.GET.get('leida', '')
 
-    notificaciones = Notificacion.objects.filter(usuario=request.user).order_by('-fechaEnvio')
+    notificaciones = Notificacion.objects.filter(usuario=request.user)
 
     if tipo_filtro:
         notificaciones = notificaciones.filter(tipo=tipo_filtro)
@@ -1662,11 +1600,15 @@ def notificaciones_encargado(request):
     elif leida_filtro == 'false':
         notificaciones = notificaciones.filter(leida=False)
 
-    total_notificaciones = Notificacion.objects.filter(usuario=request.user).count()
-    notificaciones_no_leidas = Notificacion.objects.filter(usuario=request.user, leida=False).count()
+    total_notificaciones, notificaciones_no_leidas = totales_notificaciones(request.user)
 
     if request.method == 'POST':
         accion = request.POST.get('accion')
+        if accion in ACCIONES_MASIVAS_NOTIFICACIONES:
+            _accion_masiva_notificaciones(
+                request, accion, Notificacion.objects.filter(usuario=request.user), notificaciones)
+            return redirect(request.get_full_path())
+
         notificacion_id = request.POST.get('notificacion_id')
         notificacion = get_object_or_404(Notificacion, idNotificacion=notificacion_id, usuario=request.user)
 
@@ -1682,13 +1624,47 @@ def notificaciones_encargado(request):
             notificacion.delete()
             messages.success(request, 'Notificación eliminada.')
 
-        return redirect('notificaciones_encargado')
+        # Volver a la misma página y filtros
+        return redirect(request.get_full_path())
+
+    pagina = paginar_notificaciones(notificaciones, request.GET.get('despues'), request.GET.get('antes'))
 
     return render(request, 'encargado/notificaciones_encargado.html', {
-        'notificaciones': notificaciones,
+        'notificaciones': pagina['notificaciones'],
+        'pagina': pagina,
         'total_notificaciones': total_notificaciones,
         'notificaciones_no_leidas': notificaciones_no_leidas,
         'tipo_filtro': tipo_filtro,
         'leida_filtro': leida_filtro,
     })
 
+
+@login_required
+@cache_control(private=True, no_cache=True)
+def notificaciones_nuevas(request):
+    """
+    Notificaciones del usuario posteriores al cursor ``desde`` (un id), para
+    sondear periódicamente. Responde de inmediato; sin nada nuevo cuesta una
+    búsqueda en el índice. Sin cursor devuelve solo el cursor actual.
+    """
+    usuario = request.user
+    try:
+        cursor = int(request.GET.get('desde'))
+    except (TypeError, ValueError):
+        # Sin cursor solo interesan las que lleguen desde ahora
+        return JsonResponse({'cursor': ultimo_id_notificacion(usuario), 'notificaciones': []})
+
+    nuevas = notificaciones_desde(usuario, cursor)
+    datos = {'cursor': nuevas[-1].idNotificacion if nuevas else cursor, 'notificaciones': [
+        {
+            'id': notificacion.idNotificacion,
+            'tipo': notificacion.tipo,
+            'tipo_display': notificacion.get_tipo_display(),
+            'mensaje': notificacion.mensaje,
+            'fecha': timezone.localtime(notificacion.fechaEnvio).strftime('%d/%m/%Y %H:%M'),
+        }
+        for notificacion in nuevas
+    ]}
+    if nuevas:
+        _, datos['no_leidas'] = totales_notificaciones(usuario)
+    return JsonResponse(datos, json_dumps_params={'ensure_ascii': False})